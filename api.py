@@ -1,14 +1,47 @@
-from fastapi import FastAPI
+from fastapi import BackgroundTasks, FastAPI, Header, Query, Request
+import asyncio
+import csv
+import io
+import json
+import os
 import sqlite3
-from fastapi.responses import JSONResponse
+import threading
+from contextlib import asynccontextmanager
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 
 from models.course import Course
-from models.verification import Verification
+from models.verification import BatchVerification, Verification
+from changes import get_catalog_version, get_changes_since, record_changes
+from graph import load_course_graph
+from hierarchy import ensure_course_hierarchy, get_ancestors, get_descendants, get_parents_by_child, sync_course_hierarchy
+from jobs import QueueFullError, ScrapeJobQueue
+from metrics import MetricsMiddleware, TimedConnection, logger, metrics
+from snapshot import SNAPSHOT_PATH, SnapshotLoader, encode_json, read_courses, write_catalog_snapshot
+from stats import catalog_stats_outdated, read_catalog_stats, refresh_catalog_stats
 
-app = FastAPI()
+READ_MODEL_REFRESH_INTERVAL = 2.0  # Seconds between checks whether the database changed
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Build the read models before the first request, off the event loop
+    try:
+        await asyncio.to_thread(refresh_read_models)
+    except Exception:
+        logger.exception("Building the read models failed")
+
+    refresher = asyncio.create_task(refresh_read_models_periodically())
+    yield
+    refresher.cancel()
+    scrape_jobs.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+VERIFICATION_KEY = "9f7a3c5d1e8b6f02c4a9d7e3b5f1c8a0"
 
 origins = [
     "http://localhost:4200",
@@ -23,75 +56,354 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Requests slower than this many seconds are logged with their queries, unset to disable
+SLOW_REQUEST_THRESHOLD = os.environ.get("SLOW_REQUEST_THRESHOLD")
+
+app.add_middleware(
+    MetricsMiddleware,
+    slow_request_threshold=float(SLOW_REQUEST_THRESHOLD) if SLOW_REQUEST_THRESHOLD else None,
+)
+
 
 # Function to fetch courses with objectives and child courses
-def get_courses_with_objectives():
-    connection = sqlite3.connect("courses.db")
+def get_courses_with_objectives(flat=False):
+    connection = sqlite3.connect("courses.db", factory=TimedConnection)
+    courses = read_courses(connection, flat)
+    connection.close()
+    return courses
+
+
+# Function to fetch specific courses with their objectives and tags, without nesting child courses
+def get_courses_by_z_code(z_codes):
+    connection = sqlite3.connect("courses.db", factory=TimedConnection)
     connection.row_factory = sqlite3.Row  # Access rows as dictionaries
     cursor = connection.cursor()
 
-    # Fetch all courses
-    cursor.execute("SELECT * FROM courses ORDER BY phase_is_mandatory DESC")
-    courses = cursor.fetchall()
-
-    # Fetch objectives grouped by course_z_code
-    cursor.execute("SELECT course_z_code, objective_text_nl, objective_text_en FROM objectives")
-    objectives = cursor.fetchall()
-
-    # Create a mapping of course_z_code to objectives
-    objectives_by_course = {}
-    for obj in objectives:
-        course_z_code = obj["course_z_code"]
-        if course_z_code not in objectives_by_course:
-            objectives_by_course[course_z_code] = []
-        objectives_by_course[course_z_code].append({
+    # Pass the z_codes as one JSON parameter, so there is no limit on the number of variables
+    z_codes_json = json.dumps(list(z_codes))
+
+    cursor.execute(
+        "SELECT * FROM courses WHERE z_code IN (SELECT value FROM json_each(?))",
+        (z_codes_json,)
+    )
+    courses_dict = {course["z_code"]: dict(course, objectives=[], tags=[]) for course in cursor.fetchall()}
+
+    cursor.execute(
+        """
+        SELECT course_z_code, objective_text_nl, objective_text_en
+        FROM objectives
+        WHERE course_z_code IN (SELECT value FROM json_each(?))
+        """,
+        (z_codes_json,)
+    )
+    for obj in cursor.fetchall():
+        courses_dict[obj["course_z_code"]]["objectives"].append({
             "nl": obj["objective_text_nl"],
             "en": obj["objective_text_en"]
-        })  # Opslaan als dictionary
-        
-    # Fetch tags grouped by course_z_code
+        })
+
     cursor.execute(
         """
-        SELECT ct.course_z_code, t.name 
+        SELECT ct.course_z_code, t.name
         FROM course_tag ct
         JOIN tags t ON ct.tag_id = t.id
-        """
+        WHERE ct.course_z_code IN (SELECT value FROM json_each(?))
+        """,
+        (z_codes_json,)
     )
-    tags = cursor.fetchall()
-    
-    # Create a mapping of course_z_code to tags
-    tags_by_course = {}
-    for tag in tags:
-        course_z_code = tag["course_z_code"]
-        if course_z_code not in tags_by_course:
-            tags_by_course[course_z_code] = []
-        tags_by_course[course_z_code].append(tag["name"])  # Only include name
-
-    # Create a mapping of z_code to course data
-    courses_dict = {course["z_code"]: dict(course) for course in courses}
-
-    # Process each course and add objectives, tags, and child courses
-    for course in courses_dict.values():
-        course["objectives"] = objectives_by_course.get(course["z_code"], [])  # Default to empty list
-        course["tags"] = tags_by_course.get(course["z_code"], [])  # Default to empty list
-        course["childs"] = []  # Initialize child courses list
-
-    # Assign child courses to parents
-    for course in courses_dict.values():
-        parent_course_str = course.get("parent_course")
-        if parent_course_str:
-            parent_z_codes = [z.strip() for z in parent_course_str.split(",") if z.strip()]
-            for parent_z_code in parent_z_codes:
-                if parent_z_code in courses_dict:
-                    courses_dict[parent_z_code]["childs"].append(course)
+    for tag in cursor.fetchall():
+        courses_dict[tag["course_z_code"]]["tags"].append(tag["name"])
+
+    connection.close()
+    return list(courses_dict.values())
+
 
+# Function to fetch the courses that changed after a catalog revision
+def get_changes(since, catalog_id=None):
+    connection = sqlite3.connect("courses.db", factory=TimedConnection)
+    cursor = connection.cursor()
+    current_catalog_id, revision = get_catalog_version(cursor)
+
+    # Revisions of another database can't be compared, so the client has to replace all of its courses
+    resync = since > revision or (catalog_id is not None and catalog_id != current_catalog_id)
+    if resync:
+        cursor.execute("SELECT z_code FROM courses")
+        upserted, deleted = [row[0] for row in cursor.fetchall()], []
+    else:
+        revision, upserted, deleted = get_changes_since(cursor, since)
     connection.close()
-    return list(courses_dict.values())  # Convert back to list
+
+    # Courses that were logged as upserted but no longer exist count as deleted
+    courses = get_courses_by_z_code(upserted) if upserted else []
+    found = {course["z_code"] for course in courses}
+    deleted += [z_code for z_code in upserted if z_code not in found]
+
+    return {
+        "catalog_id": current_catalog_id,
+        "revision": revision,
+        "resync": resync,
+        "upserted": courses,
+        "deleted": deleted,
+    }
+
+
+EXPORT_CHUNK_SIZE = 500  # Courses read per query while exporting
+
+
+def iter_courses_export():
+    """
+    Yield every course with its objectives and tags, one at a time.
+
+    Courses are read in chunks ordered by z_code, each continuing after the
+    last z_code of the previous chunk. Every chunk is read on its own
+    connection that is closed before anything is yielded: no read
+    transaction stays open while the client receives the stream, and the
+    generator may be resumed on another thread, as Starlette does.
+    """
+    last_z_code = ""
+    while True:
+        connection = sqlite3.connect("courses.db", factory=TimedConnection)
+        connection.row_factory = sqlite3.Row  # Access rows as dictionaries
+        try:
+            courses = connection.execute(
+                "SELECT * FROM courses WHERE z_code > ? ORDER BY z_code LIMIT ?",
+                (last_z_code, EXPORT_CHUNK_SIZE)
+            ).fetchall()
+            if not courses:
+                return
+            bounds = (courses[0]["z_code"], courses[-1]["z_code"])
+            last_z_code = bounds[1]
+
+            objectives_by_course = {}
+            for obj in connection.execute(
+                """
+                SELECT course_z_code, objective_text_nl, objective_text_en
+                FROM objectives
+                WHERE course_z_code BETWEEN ? AND ?
+                ORDER BY course_z_code, id
+                """,
+                bounds
+            ).fetchall():
+                objectives_by_course.setdefault(obj["course_z_code"], []).append({
+                    "nl": obj["objective_text_nl"],
+                    "en": obj["objective_text_en"]
+                })
+
+            tags_by_course = {}
+            for tag in connection.execute(
+                """
+                SELECT ct.course_z_code, t.name
+                FROM course_tag ct
+                JOIN tags t ON ct.tag_id = t.id
+                WHERE ct.course_z_code BETWEEN ? AND ?
+                ORDER BY ct.course_z_code, ct.id
+                """,
+                bounds
+            ).fetchall():
+                tags_by_course.setdefault(tag["course_z_code"], []).append(tag["name"])
+        finally:
+            connection.close()
+
+        for row in courses:
+            course = dict(row)
+            course["objectives"] = objectives_by_course.get(course["z_code"], [])
+            course["tags"] = tags_by_course.get(course["z_code"], [])
+            yield course
+
+
+def export_courses_ndjson():
+    for course in iter_courses_export():
+        yield json.dumps(course) + "\n"
+
+
+def export_courses_csv():
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+
+    for course in iter_courses_export():
+        if not header_written:
+            writer.writerow(course.keys())
+            header_written = True
+        # Nested values are stored as JSON, so they survive the round trip
+        course["objectives"] = json.dumps(course["objectives"])
+        course["tags"] = json.dumps(course["tags"])
+        writer.writerow(course.values())
+
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+MAX_HIERARCHY_DEPTH = 10  # Upper bound for recursive hierarchy queries
+
+
+# Function to fetch the descendants or ancestors of a course, or None if the course doesn't exist
+def get_related_courses(z_code, direction, depth):
+    connection = sqlite3.connect("courses.db", factory=TimedConnection)
+    cursor = connection.cursor()
+
+    cursor.execute("SELECT 1 FROM courses WHERE z_code = ?", (z_code,))
+    if cursor.fetchone() is None:
+        connection.close()
+        return None
+
+    if ensure_course_hierarchy(cursor):
+        connection.commit()
+    walk = get_descendants if direction == "children" else get_ancestors
+    depths = dict(walk(cursor, z_code, depth))
+    parents_by_child = get_parents_by_child(cursor, depths)
+    connection.close()
+
+    courses = get_courses_by_z_code(depths)
+    for course in courses:
+        course["depth"] = depths[course["z_code"]]
+        course["parent_z_codes"] = parents_by_child.get(course["z_code"], [])
+    courses.sort(key=lambda course: (course["depth"], course["z_code"]))
+    return courses
+
+
+# The connection graph is kept in memory and rebuilt when the catalog id or revision changes
+course_graph_cache = {"version": None, "graph": None}
+
+
+def get_course_graph():
+    connection = sqlite3.connect("courses.db", factory=TimedConnection)
+    cursor = connection.cursor()
+    version = get_catalog_version(cursor)
+    hit = course_graph_cache["graph"] is not None and course_graph_cache["version"] == version
+    metrics.observe_cache("course_graph", hit)
+    if not hit:
+        course_graph_cache["graph"] = load_course_graph(cursor)
+        course_graph_cache["version"] = version
+    connection.close()
+    return course_graph_cache["graph"]
+
+
+# Function to fetch the courses directly before or after a course, or None if the course doesn't exist
+def get_connected_courses(z_code, direction):
+    graph = get_course_graph()
+    if z_code not in graph:
+        return None
+
+    adjacency = graph.successors if direction == "successors" else graph.predecessors
+    z_codes = adjacency.get(z_code, [])
+    courses_dict = {course["z_code"]: course for course in get_courses_by_z_code(z_codes)}
+    return [courses_dict[z] for z in z_codes if z in courses_dict]
+
+
+# Compiled catalog, memory-mapped by every worker
+snapshot_loader = SnapshotLoader(SNAPSHOT_PATH)
+
+
+# Function to fetch the snapshot, or None if there is none matching the current catalog
+def get_current_snapshot():
+    snapshot = snapshot_loader.get()
+    if snapshot is None:
+        return None
+
+    connection = sqlite3.connect("courses.db", factory=TimedConnection)
+    version = get_catalog_version(connection.cursor())
+    connection.close()
+    return snapshot if snapshot.version == version else None
+
+
+# The read models are swapped as a whole, requests keep using the previous version until the new one is ready
+read_model_state = {"current": None}
+read_models_lock = threading.Lock()
+
+
+def get_database_generation():
+    try:
+        stat = os.stat("courses.db")
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def refresh_read_models():
+    """Rebuild the read models if the database changed since they were built."""
+    with read_models_lock:
+        generation = get_database_generation()
+        current = read_model_state["current"]
+        if generation is None or (current is not None and current["generation"] == generation):
+            return
+
+        write_catalog_snapshot("courses.db", SNAPSHOT_PATH, factory=TimedConnection)
+
+        connection = sqlite3.connect("courses.db", factory=TimedConnection)
+        cursor = connection.cursor()
+        version = get_catalog_version(cursor)
+
+        # Recompute the aggregates outside the write that made them outdated, so it doesn't hold the write lock
+        if catalog_stats_outdated(cursor):
+            refresh_catalog_stats(cursor)
+            connection.commit()
+        connection.close()
+
+        # Only keep a snapshot of exactly this catalog, otherwise requests fall back to SQLite
+        snapshot = snapshot_loader.get()
+        if snapshot is not None and snapshot.version != version:
+            snapshot = None
+
+        read_model_state["current"] = {
+            "generation": generation,
+            "courses": snapshot,
+            "tags": encode_json(get_tags()),
+            "profiles": encode_json(get_profiles()),
+        }
+
+
+async def refresh_read_models_periodically():
+    while True:
+        await asyncio.sleep(READ_MODEL_REFRESH_INTERVAL)
+        try:
+            await asyncio.to_thread(refresh_read_models)
+        except Exception:
+            logger.exception("Refreshing the read models failed")
+
+
+# Re-scrape jobs run on a small worker pool and refresh the read models when they are done
+scrape_jobs = ScrapeJobQueue(max_workers=2, max_queued=100, on_change=refresh_read_models)
+
+
+# Function to fetch the course snapshot, from the read models if they are built
+def get_courses_snapshot():
+    current = read_model_state["current"]
+    if current is not None and current["courses"] is not None:
+        return current["courses"]
+    return get_current_snapshot()
+
+
+def snapshot_response(request: Request, snapshot, encoded):
+    """Serve a slice of the snapshot, the gzipped variant if the client accepts it."""
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(
+            content=encoded(True),
+            media_type="application/json",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        )
+    return Response(content=encoded(False), media_type="application/json", headers={"Vary": "Accept-Encoding"})
+
+
+# Function to fetch the materialized catalog aggregates, computing them once for older databases
+def get_stats():
+    connection = sqlite3.connect("courses.db", factory=TimedConnection)
+    cursor = connection.cursor()
+
+    stats = read_catalog_stats(cursor)
+    if stats is None:
+        refresh_catalog_stats(cursor)
+        connection.commit()
+        stats = read_catalog_stats(cursor)
+
+    connection.close()
+    return stats
 
 
 # Function to fetch tags
 def get_tags():
-    tag = sqlite3.connect("courses.db")
+    tag = sqlite3.connect("courses.db", factory=TimedConnection)
     tag.row_factory = sqlite3.Row  # Access rows as dictionaries
     cursor = tag.cursor()
 
@@ -107,7 +419,7 @@ def get_tags():
 
 # Function to fetch profiles
 def get_profiles():
-    profile = sqlite3.connect("courses.db")
+    profile = sqlite3.connect("courses.db", factory=TimedConnection)
     profile.row_factory = sqlite3.Row  # Access rows as dictionaries
     cursor = profile.cursor()
 
@@ -138,7 +450,7 @@ def get_profiles():
 
 
 def insert_course(course: Course):
-    conn = sqlite3.connect("courses.db")
+    conn = sqlite3.connect("courses.db", factory=TimedConnection)
     conn.row_factory = sqlite3.Row  # Access rows as dictionaries
     cursor = conn.cursor()
 
@@ -224,47 +536,494 @@ def insert_course(course: Course):
         else:
             print(f"Tag '{tag_name}' not found in database.")
 
+    sync_course_hierarchy(cursor, [course_id])
+    record_changes(cursor, [course_id])
+
     # Commit and close
     conn.commit()
     conn.close()
 
+
+# Function to fetch a mapping of tag name to tag id
+def get_tag_ids(cursor):
+    cursor.execute("SELECT id, name FROM tags")
+    return {row[1]: row[0] for row in cursor.fetchall()}
+
+
+def insert_courses(courses: List[Course]):
+    """
+    Insert or update many courses in a single transaction.
+
+    Every course gets its own savepoint, so a failing course is rolled back
+    without affecting the others. Objectives and tags of all successful
+    courses are written afterwards with executemany.
+
+    Returns:
+        list: One result dictionary per submitted course, in the same order.
+    """
+    conn = sqlite3.connect("courses.db", factory=TimedConnection)
+    conn.row_factory = sqlite3.Row  # Access rows as dictionaries
+    cursor = conn.cursor()
+
+    results = [{"z_code": course.z_code, "status": "ok"} for course in courses]
+
+    # Savepoints must not start the transaction themselves. IMMEDIATE takes the write lock
+    # before the lookups below, so they can't go stale and the transaction can't deadlock on upgrading
+    cursor.execute("BEGIN IMMEDIATE")
+
+    # Resolve all tag names in one query
+    tag_ids = get_tag_ids(cursor)
+
+    # Fetch the real courses of this batch and their pending copies from earlier calls in one query
+    real_z_codes = {course.z_code.removesuffix("_pending") for course in courses}
+    z_codes = list(real_z_codes | {real_z_code + "_pending" for real_z_code in real_z_codes})
+    placeholders = ", ".join("?" for _ in z_codes)
+    cursor.execute(f"SELECT * FROM courses WHERE z_code IN ({placeholders})", z_codes)
+    existing = {row["z_code"]: row for row in cursor.fetchall()}
+
+    written = {}  # course_id -> index of the course that wrote it last
+    for index, course in enumerate(courses):
+        real_z_code = course.z_code.removesuffix("_pending")
+        original_course = existing.get(real_z_code)
+        if original_course is not None and original_course["status"] != "APPROVED":
+            original_course = None
+        # A pending copy that was archived by a verification is reused for the next edit
+        existingduplicate_course = existing.get(real_z_code + "_pending")
+
+        if not existingduplicate_course and not original_course:
+            results[index].update(status="error", message="Course not found")
+            continue
+
+        cursor.execute("SAVEPOINT batch_item")
+        try:
+            if existingduplicate_course:
+                # If a duplicate course with status PENDING exists, UPDATE the course record
+                cursor.execute("""
+                    UPDATE courses
+                    SET summary_nl = ?, summary_en = ?, credits = ?, status = 'PENDING'
+                    WHERE z_code = ?
+                """, (course.summary, course.summaryEnglish, course.credits, existingduplicate_course["z_code"]))
+                course_id = existingduplicate_course["z_code"]
+            else:
+                # If no duplicate course with status PENDING exists, INSERT the new course
+                course_id = original_course["z_code"] + "_pending"
+                cursor.execute("""
+                    INSERT INTO courses
+                    (z_code, course_name, phase, phase_is_mandatory, summary_nl,
+                    summary_en, semester, learning_contents_nl, learning_contents_en,
+                    learning_track_id, programme, language, credits, parent_course, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    course_id,
+                    original_course["course_name"],
+                    original_course["phase"],
+                    original_course["phase_is_mandatory"],
+                    course.summary,
+                    course.summaryEnglish,
+                    original_course["semester"],
+                    original_course["learning_contents_nl"],
+                    "",
+                    original_course["learning_track_id"],
+                    original_course["programme"],
+                    original_course["language"],
+                    original_course["credits"],
+                    original_course["parent_course"],
+                    "PENDING"
+                ))
+                # Later items for the same course update this pending course instead of inserting it again
+                existing[course_id] = {"z_code": course_id}
+            cursor.execute("RELEASE SAVEPOINT batch_item")
+        except sqlite3.Error as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT batch_item")
+            cursor.execute("RELEASE SAVEPOINT batch_item")
+            results[index].update(status="error", message=str(e))
+            continue
+
+        # A later submission for the same course wins, like sequential calls would
+        if course_id in written:
+            results[written[course_id]]["message"] = "Superseded by a later item in the batch"
+        written[course_id] = index
+
+        unknown_tags = [tag_name for tag_name in course.tags if tag_name not in tag_ids]
+        if unknown_tags:
+            results[index]["unknown_tags"] = unknown_tags
+        results[index]["course_id"] = course_id
+
+    course_ids = [(course_id,) for course_id in written]
+    objective_rows = []
+    tag_rows = []
+    for course_id, index in written.items():
+        course = courses[index]
+        objective_rows.extend((course_id, obj.nl, obj.en) for obj in course.objectives)
+        tag_rows.extend((course_id, tag_ids[tag_name]) for tag_name in course.tags if tag_name in tag_ids)
+
+    # Replace objectives and tags of all written courses at once
+    cursor.executemany("DELETE FROM objectives WHERE course_z_code = ?", course_ids)
+    cursor.executemany("DELETE FROM course_tag WHERE course_z_code = ?", course_ids)
+    cursor.executemany("""
+        INSERT INTO objectives (course_z_code, objective_text_nl, objective_text_en)
+        VALUES (?, ?, ?)
+    """, objective_rows)
+    cursor.executemany("""
+        INSERT INTO course_tag (course_z_code, tag_id)
+        VALUES (?, ?)
+    """, tag_rows)
+
+    sync_course_hierarchy(cursor, list(written))
+    record_changes(cursor, list(written))
+
+    # Commit and close
+    conn.commit()
+    conn.close()
+    return results
+
+def migrate_pending_courses(cursor, pairs):
+    """
+    Copy pending course data onto the real courses and archive the pending ones.
+
+    All pairs are migrated with set-based statements, so the number of queries
+    does not depend on the number of courses, objectives or tags.
+
+    Args:
+        cursor: Cursor of an open connection, committed by the caller.
+        pairs (list): Tuples of (pending_z_code, real_z_code).
+    """
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS verification_batch (
+            pending_z_code TEXT PRIMARY KEY,
+            real_z_code TEXT
+        )
+    """)
+    cursor.execute("DELETE FROM verification_batch")
+    cursor.executemany("INSERT INTO verification_batch (pending_z_code, real_z_code) VALUES (?, ?)", pairs)
+
+    # Update the real courses with the data of their pending course
+    cursor.execute("""
+        UPDATE courses
+        SET summary_nl = pending.summary_nl, summary_en = pending.summary_en, credits = pending.credits
+        FROM verification_batch vb
+        JOIN courses pending ON pending.z_code = vb.pending_z_code
+        WHERE courses.z_code = vb.real_z_code
+    """)
+
+    # Replace the objectives of the real courses
+    cursor.execute("""
+        DELETE FROM objectives
+        WHERE course_z_code IN (SELECT real_z_code FROM verification_batch)
+    """)
+    cursor.execute("""
+        INSERT INTO objectives (course_z_code, objective_text_nl, objective_text_en)
+        SELECT vb.real_z_code, o.objective_text_nl, o.objective_text_en
+        FROM objectives o
+        JOIN verification_batch vb ON o.course_z_code = vb.pending_z_code
+        ORDER BY o.id
+    """)
+
+    # Replace the tags of the real courses
+    cursor.execute("""
+        DELETE FROM course_tag
+        WHERE course_z_code IN (SELECT real_z_code FROM verification_batch)
+    """)
+    cursor.execute("""
+        INSERT INTO course_tag (course_z_code, tag_id)
+        SELECT vb.real_z_code, ct.tag_id
+        FROM course_tag ct
+        JOIN verification_batch vb ON ct.course_z_code = vb.pending_z_code
+        ORDER BY ct.id
+    """)
+
+    # Archive the pending courses, so they are no longer shown
+    cursor.execute("""
+        UPDATE courses
+        SET status = 'ARCHIVED'
+        WHERE z_code IN (SELECT pending_z_code FROM verification_batch)
+    """)
+
+    cursor.execute("DELETE FROM verification_batch")
+
+    record_changes(cursor, [pending_z_code for pending_z_code, _ in pairs] + [real_z_code for _, real_z_code in pairs])
+
+
+def verify_courses(z_codes: List[str]):
+    """
+    Migrate many pending courses to their real course in one transaction.
+
+    Returns:
+        list: One outcome dictionary per z_code, in the same order.
+    """
+    connection = sqlite3.connect("courses.db", factory=TimedConnection)
+    cursor = connection.cursor()
+
+    # Fetch all involved courses in one query
+    real_z_codes = [z_code.replace("_pending", "") for z_code in z_codes]
+    lookup = list(set(z_codes) | set(real_z_codes))
+    placeholders = ", ".join("?" for _ in lookup)
+    cursor.execute(f"SELECT z_code FROM courses WHERE z_code IN ({placeholders})", lookup)
+    existing = {row[0] for row in cursor.fetchall()}
+
+    results = []
+    pairs = {}
+    for z_code, real_z_code in zip(z_codes, real_z_codes):
+        if not z_code.endswith("_pending"):
+            results.append({"z_code": z_code, "status": "error", "message": "Course not migrateable"})
+        elif z_code not in existing:
+            results.append({"z_code": z_code, "status": "error", "message": "Pending course niet gevonden."})
+        elif real_z_code not in existing:
+            results.append({"z_code": z_code, "status": "error", "message": "Echte course niet gevonden."})
+        else:
+            results.append({"z_code": z_code, "status": "ok", "message": "Verification gelukt!"})
+            pairs[z_code] = real_z_code
+
+    if pairs:
+        migrate_pending_courses(cursor, list(pairs.items()))
+
+    connection.commit()
+    connection.close()
+    return results
+
 @app.get("/courses")
-async def get_all_courses():
+async def get_all_courses(request: Request, flat: bool = False):
+    try:
+        snapshot = None if flat else get_courses_snapshot()
+        if snapshot is not None:
+            return snapshot_response(request, snapshot, snapshot.course_list)
+
+        courses = get_courses_with_objectives(flat)
+        return JSONResponse(content=courses, status_code=200)
+    except Exception as e:
+        logger.exception("Request failed")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
+EXPORT_FORMATS = {
+    "ndjson": (export_courses_ndjson, "application/x-ndjson"),
+    "csv": (export_courses_csv, "text/csv"),
+}
+
+@app.get("/courses/export")
+async def export_all_courses(format: str = "ndjson"):
+    if format not in EXPORT_FORMATS:
+        return JSONResponse(content={"error": f"Unknown export format '{format}'"}, status_code=400)
+
+    # A sync generator is iterated in the threadpool, so the blocking reads don't stall other requests
+    export, media_type = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        export(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=courses.{format}"}
+    )
+
+@app.get("/courses/{z_code}")
+async def get_course(request: Request, z_code: str):
+    try:
+        snapshot = get_courses_snapshot()
+        if snapshot is not None:
+            if snapshot.course(z_code) is None:
+                return JSONResponse(content={"error": "Course not found"}, status_code=404)
+            return snapshot_response(request, snapshot, lambda compressed: snapshot.course(z_code, compressed))
+
+        # Without a snapshot, fall back to building the whole catalog
+        for course in get_courses_with_objectives():
+            if course["z_code"] == z_code:
+                return JSONResponse(content=course, status_code=200)
+        return JSONResponse(content={"error": "Course not found"}, status_code=404)
+    except Exception as e:
+        logger.exception("Request failed")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/courses/{z_code}/children")
+async def get_course_children(z_code: str, depth: int = Query(MAX_HIERARCHY_DEPTH, ge=1, le=MAX_HIERARCHY_DEPTH)):
+    try:
+        courses = get_related_courses(z_code, "children", depth)
+        if courses is None:
+            return JSONResponse(content={"error": "Course not found"}, status_code=404)
+        return JSONResponse(content=courses, status_code=200)
+    except Exception as e:
+        logger.exception("Request failed")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/courses/{z_code}/ancestors")
+async def get_course_ancestors(z_code: str, depth: int = Query(MAX_HIERARCHY_DEPTH, ge=1, le=MAX_HIERARCHY_DEPTH)):
+    try:
+        courses = get_related_courses(z_code, "ancestors", depth)
+        if courses is None:
+            return JSONResponse(content={"error": "Course not found"}, status_code=404)
+        return JSONResponse(content=courses, status_code=200)
+    except Exception as e:
+        logger.exception("Request failed")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/courses/{z_code}/successors")
+async def get_course_successors(z_code: str):
     try:
-        courses = get_courses_with_objectives()
+        courses = get_connected_courses(z_code, "successors")
+        if courses is None:
+            return JSONResponse(content={"error": "Course not found"}, status_code=404)
         return JSONResponse(content=courses, status_code=200)
     except Exception as e:
+        logger.exception("Request failed")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
+@app.get("/courses/{z_code}/predecessors")
+async def get_course_predecessors(z_code: str):
+    try:
+        courses = get_connected_courses(z_code, "predecessors")
+        if courses is None:
+            return JSONResponse(content={"error": "Course not found"}, status_code=404)
+        return JSONResponse(content=courses, status_code=200)
+    except Exception as e:
+        logger.exception("Request failed")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/study-path/order")
+async def get_study_order():
+    try:
+        order, in_cycle = get_course_graph().study_order()
+        return JSONResponse(content={"order": order, "cycles": in_cycle}, status_code=200)
+    except Exception as e:
+        logger.exception("Request failed")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/study-path")
+async def get_study_path(from_z_code: str = Query(..., alias="from"), to_z_code: str = Query(..., alias="to")):
+    try:
+        graph = get_course_graph()
+        if from_z_code not in graph or to_z_code not in graph:
+            return JSONResponse(content={"error": "Course not found"}, status_code=404)
+        path = graph.shortest_path(from_z_code, to_z_code)
+        if path is None:
+            return JSONResponse(content={"error": "No study path between these courses"}, status_code=404)
+        return JSONResponse(content={"path": path}, status_code=200)
+    except Exception as e:
+        logger.exception("Request failed")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/changes")
+async def get_catalog_changes(since: int = 0, catalog_id: Optional[str] = None):
+    try:
+        changes = get_changes(since, catalog_id)
+        return JSONResponse(content=changes, status_code=200)
+    except Exception as e:
+        logger.exception("Request failed")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+CHANGE_POLL_INTERVAL = 1.0  # Seconds between checks for new revisions
+CHANGE_HEARTBEAT_INTERVAL = 15  # Polls without changes before a keep-alive comment is sent
+
+@app.get("/changes/stream")
+async def stream_catalog_changes(since: int = 0, catalog_id: Optional[str] = None,
+                                 last_event_id: Optional[str] = Header(None)):
+    # A reconnecting EventSource sends the last event id it received, "<catalog id>:<revision>"
+    if last_event_id is not None:
+        event_catalog_id, _, event_revision = last_event_id.rpartition(":")
+        if event_revision.isdigit():
+            since = int(event_revision)
+            catalog_id = event_catalog_id or None
+
+    async def event_stream(since, catalog_id):
+        idle_polls = 0
+        while True:
+            changes = await asyncio.to_thread(get_changes, since, catalog_id)
+            if changes["resync"] or changes["revision"] > since:
+                since = changes["revision"]
+                catalog_id = changes["catalog_id"]
+                idle_polls = 0
+                yield f"id: {catalog_id or ''}:{since}\nevent: changes\ndata: {json.dumps(changes)}\n\n"
+            else:
+                idle_polls += 1
+                if idle_polls >= CHANGE_HEARTBEAT_INTERVAL:
+                    idle_polls = 0
+                    yield ": keep-alive\n\n"
+            await asyncio.sleep(CHANGE_POLL_INTERVAL)
+
+    return StreamingResponse(event_stream(since, catalog_id), media_type="text/event-stream")
+
+@app.post("/scrape/programme")
+async def scrape_programme():
+    try:
+        job = scrape_jobs.enqueue_programme()
+        return JSONResponse(content=job, status_code=202)
+    except QueueFullError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503)
+
+@app.post("/scrape/{z_code}")
+async def scrape_course(z_code: str):
+    try:
+        job = scrape_jobs.enqueue_course(z_code)
+        return JSONResponse(content=job, status_code=202)
+    except QueueFullError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503)
+
+@app.get("/scrape/jobs/{job_id}")
+async def get_scrape_job(job_id: str):
+    job = scrape_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Job not found"}, status_code=404)
+    return JSONResponse(content=job, status_code=200)
+
+@app.get("/stats")
+async def get_catalog_stats():
+    try:
+        stats = get_stats()
+        return JSONResponse(content=stats, status_code=200)
+    except Exception as e:
+        logger.exception("Request failed")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/tags")
 async def get_all_tags():
     try:
+        current = read_model_state["current"]
+        if current is not None:
+            return Response(content=current["tags"], media_type="application/json")
+
         tags = get_tags()
         return JSONResponse(content=tags, status_code=200)
     except Exception as e:
+        logger.exception("Request failed")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 @app.get("/profiles")
 async def get_all_profiles():
     try:
+        current = read_model_state["current"]
+        if current is not None:
+            return Response(content=current["profiles"], media_type="application/json")
+
         profiles = get_profiles()
         return JSONResponse(content=profiles, status_code=200)
     except Exception as e:
+        logger.exception("Request failed")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 @app.post("/add_course/")
-async def add_course(course: Course):
+async def add_course(course: Course, background_tasks: BackgroundTasks):
     try:
         insert_course(course)
+        background_tasks.add_task(refresh_read_models)
         return JSONResponse(content="Course added successfully", status_code=200)
     except Exception as e:
+        logger.exception("Request failed")
         return JSONResponse(content={"error": str(e)}, status_code=500)
-    
+
+@app.post("/courses/batch")
+async def add_courses(courses: List[Course], background_tasks: BackgroundTasks):
+    try:
+        results = insert_courses(courses)
+        background_tasks.add_task(refresh_read_models)
+        return JSONResponse(content=results, status_code=200)
+    except Exception as e:
+        logger.exception("Request failed")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
 @app.post("/verification")
-async def verify(request: Verification):
+async def verify(request: Verification, background_tasks: BackgroundTasks):
     # Hier kan je de validatie en logica toevoegen
-    if request.key == "9f7a3c5d1e8b6f02c4a9d7e3b5f1c8a0":
+    if request.key == VERIFICATION_KEY:
         # Migration van pending naar real course
         # Check of de z_code eindigt op "_pending"
         if not request.z_code.endswith("_pending"):
@@ -273,7 +1032,7 @@ async def verify(request: Verification):
         # Bepaal de echte course z_code (zonder '_pending')
         real_z_code = request.z_code.replace("_pending", "")
 
-        connection = sqlite3.connect("courses.db")
+        connection = sqlite3.connect("courses.db", factory=TimedConnection)
         connection.row_factory = sqlite3.Row
         cursor = connection.cursor()
 
@@ -293,52 +1052,24 @@ async def verify(request: Verification):
             connection.close()
             return {"status": "error", "message": "Echte course niet gevonden."}
 
-        # Update de echte course met gegevens van de pending course
-        cursor.execute("""
-            UPDATE courses 
-            SET summary_nl = ?, summary_en = ?, credits = ?
-            WHERE z_code = ?
-        """, (pending_course["summary_nl"], pending_course["summary_en"], 
-            pending_course["credits"], real_z_code))
-
-        # Haal alle objectives van de pending course op
-        cursor.execute("SELECT * FROM objectives WHERE course_z_code = ?", (request.z_code,))
-        objectives = cursor.fetchall()
-        
-        # Verwijder eerst alle objectives van de echte course
-        cursor.execute("DELETE FROM objectives WHERE course_z_code = ?", (real_z_code,))
-
-        # Zet de objectives over naar de echte course
-        for obj in objectives:
-            cursor.execute("""
-                INSERT INTO objectives (course_z_code, objective_text_nl, objective_text_en)
-                VALUES (?, ?, ?)
-            """, (real_z_code, obj["objective_text_nl"], obj["objective_text_en"]))
-            
-        # Verwijder eerst alle tags van de echte course
-        cursor.execute("DELETE FROM course_tag WHERE course_z_code = ?", (real_z_code,))
-
-        # Haal alle tags van de pending course op
-        cursor.execute("SELECT * FROM course_tag WHERE course_z_code = ?", (request.z_code,))
-        tags = cursor.fetchall()
-    
-        # Zet de tags over naar de echte course
-        for tag in tags:
-            cursor.execute("""
-                INSERT INTO course_tag (course_z_code, tag_id)
-                VALUES (?, ?)
-            """, (real_z_code, tag["tag_id"]))
-
-
-        # Pas status pending course aan, zodat we hem niet meer zien, tenzij we dat echt willen
-        cursor.execute("""
-            UPDATE courses 
-            SET status = 'ARCHIVED'
-            WHERE z_code = ?
-        """, (request.z_code,))
+        # Zet de pending course over naar de echte course
+        migrate_pending_courses(cursor, [(request.z_code, real_z_code)])
 
         connection.commit()
         connection.close()
 
+        background_tasks.add_task(refresh_read_models)
         return {"message": "Verification gelukt!"}  
-    return {"status": "error", "message": "Invalid credentials"}
\ No newline at end of file
+    return {"status": "error", "message": "Invalid credentials"}
+
+@app.post("/verification/batch")
+async def verify_batch(request: BatchVerification, background_tasks: BackgroundTasks):
+    if request.key == VERIFICATION_KEY:
+        try:
+            results = verify_courses(request.z_codes)
+            background_tasks.add_task(refresh_read_models)
+            return JSONResponse(content=results, status_code=200)
+        except Exception as e:
+            logger.exception("Request failed")
+            return JSONResponse(content={"error": str(e)}, status_code=500)
+    return {"status": "error", "message": "Invalid credentials"}
@@ -0,0 +1,226 @@
+"""
+Generate a synthetic courses.db with the schema api.py expects.
+
+Usage (from the repository root):
+    python -m benchmarks.generate_catalog --courses 10000 --objectives 6 --tags 50 --depth 3 --db benchmarks/courses.db
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+
+from changes import record_changes, setup_change_log
+from graph import generate_course_connections, index_course_connections
+from hierarchy import setup_course_hierarchy, sync_course_hierarchy
+from stats import refresh_catalog_stats
+
+BATCH_SIZE = 10000  # Rows per executemany call, keeps memory flat for large catalogs
+
+LEARNING_TRACKS = [
+    "Application Development",
+    "Artificial Intelligence",
+    "Digital Innovation",
+    "Cloud & Cybersecurity",
+]
+
+
+# Function to create the tables with the columns used by api.py
+def setup_database(db_path):
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            img TEXT,
+            route TEXT,
+            title_nl TEXT,
+            title_en TEXT,
+            description_nl TEXT,
+            description_en TEXT
+        )
+        ''')
+    cursor.execute('CREATE TABLE learning_tracks (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT)')
+    cursor.execute('CREATE TABLE tags (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, hex_color TEXT)')
+    cursor.execute('''
+        CREATE TABLE courses (
+            z_code TEXT PRIMARY KEY,
+            course_name TEXT,
+            phase INTEGER,
+            phase_is_mandatory BOOLEAN,
+            summary_nl TEXT,
+            summary_en TEXT,
+            semester INTEGER,
+            learning_contents_nl TEXT,
+            learning_contents_en TEXT,
+            learning_track_id INTEGER,
+            programme TEXT,
+            language TEXT,
+            credits INTEGER,
+            parent_course TEXT,
+            status TEXT,
+            FOREIGN KEY (learning_track_id) REFERENCES learning_tracks(id)
+        )
+        ''')
+    cursor.execute('''
+        CREATE TABLE objectives (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_z_code TEXT,
+            objective_text_nl TEXT,
+            objective_text_en TEXT,
+            FOREIGN KEY (course_z_code) REFERENCES courses(z_code)
+        )
+        ''')
+    cursor.execute('''
+        CREATE TABLE course_connections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            z_code_1 TEXT,
+            z_code_2 TEXT,
+            FOREIGN KEY (z_code_1) REFERENCES courses(z_code),
+            FOREIGN KEY (z_code_2) REFERENCES courses(z_code)
+        )
+        ''')
+    cursor.execute('''
+        CREATE TABLE course_tag (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_z_code INTEGER,
+            tag_id INTEGER,
+            FOREIGN KEY (course_z_code) REFERENCES courses(z_code),
+            FOREIGN KEY (tag_id) REFERENCES tags(id)
+        )
+        ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_objectives_course_z_code ON objectives (course_z_code)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_course_tag_course_z_code ON course_tag (course_z_code)')
+    index_course_connections(cursor)
+    setup_course_hierarchy(cursor)
+    setup_change_log(cursor)
+
+    return conn, cursor
+
+
+def insert_in_batches(cursor, sql, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+
+
+def z_code_for(index):
+    return f"Z{index:07d}"
+
+
+def generate_courses(count, depth, programmes, rng):
+    """
+    Yield course rows. Courses are grouped in chains of depth + 1, where each
+    course is the child of the previous one. Every tenth child also gets the
+    root of the previous chain as a second parent, so subtrees are shared.
+    """
+    chain_length = depth + 1
+    for index in range(count):
+        position = index % chain_length
+        parents = []
+        if position > 0:
+            parents.append(z_code_for(index - 1))
+            if index % 10 == 0 and index >= chain_length + position:
+                parents.append(z_code_for(index - position - chain_length))
+
+        yield (
+            z_code_for(index),
+            f"Synthetic course {index}",
+            rng.randint(1, 3),
+            rng.random() < 0.6,
+            f"Samenvatting van cursus {index}",
+            f"Summary of course {index}",
+            rng.randint(1, 2),
+            f"<div><p>Leerinhoud van cursus {index}</p></div>",
+            "",
+            rng.randint(1, len(LEARNING_TRACKS)),
+            f"Programme {index % programmes}",
+            "nl",
+            rng.choice([3, 4, 6, 9, 12]),
+            ",".join(parents) or None,
+            "APPROVED",
+        )
+
+
+def generate_catalog(db_path, courses, objectives, tags, tags_per_course, depth, programmes, seed):
+    rng = random.Random(seed)
+    random.seed(seed)  # generate_course_connections uses the module level generator
+    conn, cursor = setup_database(db_path)
+
+    cursor.executemany('INSERT INTO learning_tracks (name) VALUES (?)', [(track,) for track in LEARNING_TRACKS])
+    cursor.executemany(
+        'INSERT INTO tags (name, hex_color) VALUES (?, ?)',
+        [(f"Tag {index}", f"#{rng.randrange(0x1000000):06x}") for index in range(tags)]
+    )
+    cursor.executemany(
+        '''INSERT INTO profiles (name, img, route, title_nl, title_en, description_nl, description_en)
+           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+        [(f"profile-{index}", f"profile-{index}.png", f"/profiles/{index}",
+          f"Profiel {index}", f"Profile {index}", "Beschrijving", "Description")
+         for index in range(min(tags, 10))]
+    )
+
+    insert_in_batches(
+        cursor,
+        'INSERT INTO courses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        generate_courses(courses, depth, programmes, rng)
+    )
+    insert_in_batches(
+        cursor,
+        'INSERT INTO objectives (course_z_code, objective_text_nl, objective_text_en) VALUES (?, ?, ?)',
+        ((z_code_for(index), f"Doelstelling {number} van cursus {index}", f"Objective {number} of course {index}")
+         for index in range(courses) for number in range(objectives))
+    )
+    if tags:
+        insert_in_batches(
+            cursor,
+            'INSERT INTO course_tag (course_z_code, tag_id) VALUES (?, ?)',
+            ((z_code_for(index), tag_id)
+             for index in range(courses)
+             for tag_id in rng.sample(range(1, tags + 1), min(tags_per_course, tags)))
+        )
+
+    cursor.execute("SELECT z_code, phase FROM courses")
+    insert_in_batches(
+        cursor,
+        'INSERT INTO course_connections (z_code_1, z_code_2) VALUES (?, ?)',
+        generate_course_connections(cursor.fetchall())
+    )
+    sync_course_hierarchy(cursor)
+    record_changes(cursor, (z_code_for(index) for index in range(courses)))
+    refresh_catalog_stats(cursor)
+
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic courses.db for load tests.")
+    parser.add_argument("--db", default="benchmarks/courses.db", help="Path of the database to (re)create.")
+    parser.add_argument("--courses", type=int, default=1000, help="Number of courses.")
+    parser.add_argument("--objectives", type=int, default=6, help="Objectives per course.")
+    parser.add_argument("--tags", type=int, default=11, help="Number of tags.")
+    parser.add_argument("--tags-per-course", type=int, default=2, help="Tags linked to every course.")
+    parser.add_argument("--depth", type=int, default=1, help="Parent/child depth, 0 for no hierarchy.")
+    parser.add_argument("--programmes", type=int, default=1, help="Number of programmes the courses are spread over.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for reproducible catalogs.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generate_catalog(args.db, args.courses, args.objectives, args.tags, args.tags_per_course,
+                     args.depth, args.programmes, args.seed)
+    print(f"Generated {args.courses} courses in {args.db} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
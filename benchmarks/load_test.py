@@ -0,0 +1,282 @@
+"""
+Run a mixed read/write workload against the API and report latency per endpoint.
+
+Usage (from the repository root):
+    python -m benchmarks.generate_catalog --courses 10000 --db benchmarks/courses.db
+    python -m benchmarks.load_test --db benchmarks/courses.db --duration 30 --concurrency 8
+
+The API is started in-process with uvicorn, in the directory of the database
+(which must be named courses.db, like api.py expects), unless --url points to
+a server that is already running. Results are written as JSON to
+benchmarks/results/, so runs can be compared across commits.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import sqlite3
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from api import VERIFICATION_KEY
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+DEFAULT_MIX = "courses=1,tags=5,profiles=5,add_course=2,verification=1"
+
+# Endpoints that report failures with status 200, as {"status": "error"}, batch endpoints per item
+BODY_STATUS_ENDPOINTS = {"verification"}
+
+
+class Workload:
+    """Picks requests according to the mix and tracks which courses are free to edit."""
+
+    def __init__(self, z_codes, mix, seed):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.fresh = list(z_codes)  # Approved courses without a pending copy yet
+        self.rng.shuffle(self.fresh)
+        self.pending = []  # Pending copies that can be verified
+        self.operations = list(mix)
+        self.weights = [mix[operation] for operation in self.operations]
+
+    def next_request(self):
+        """Returns: tuple of (endpoint name, method, path, body)."""
+        with self.lock:
+            operation = self.rng.choices(self.operations, self.weights)[0]
+
+            if operation == "add_course" and self.fresh:
+                z_code = self.fresh.pop()
+                body = {
+                    "z_code": z_code,
+                    "summary": "Aangepaste samenvatting",
+                    "summaryEnglish": "Edited summary",
+                    "objectives": [{"nl": "Nieuwe doelstelling", "en": "New objective"}],
+                    "tags": [],
+                    "credits": 6,
+                }
+                return "add_course", "POST", "/add_course/", body
+
+            if operation == "verification" and self.pending:
+                z_code = self.pending.pop(0)
+                return "verification", "POST", "/verification", {"z_code": z_code, "key": VERIFICATION_KEY}
+
+            if operation in ("add_course", "verification"):
+                # Nothing left to edit, fall back to a cheap read
+                operation = "tags"
+            return operation, "GET", f"/{operation}", None
+
+    def completed(self, endpoint, body, failed):
+        # Only verify pending copies that the API has actually created
+        if endpoint == "add_course" and not failed:
+            with self.lock:
+                self.pending.append(body["z_code"] + "_pending")
+
+
+def response_failed(endpoint, status, content):
+    if status >= 400:
+        return True
+    if endpoint not in BODY_STATUS_ENDPOINTS:
+        return False
+    try:
+        result = json.loads(content)
+    except ValueError:
+        return True
+    items = result if isinstance(result, list) else [result]
+    return any(isinstance(item, dict) and item.get("status") == "error" for item in items)
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    results = {}
+    for endpoint, endpoint_samples in sorted(samples.items()):
+        # Failed requests are counted, but left out of the latencies, so fast failures don't skew them
+        latencies = sorted(latency for latency, _, _, failed in endpoint_samples if not failed)
+        results[endpoint] = {
+            "requests": len(endpoint_samples),
+            "errors": len(endpoint_samples) - len(latencies),
+            "throughput_rps": len(endpoint_samples) / elapsed,
+            "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else None,
+            "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else None,
+            "p95_ms": percentile(latencies, 0.95) * 1000 if latencies else None,
+            "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+            "max_ms": latencies[-1] * 1000 if latencies else None,
+            "mean_response_bytes": sum(size for _, _, size, _ in endpoint_samples) / len(endpoint_samples),
+        }
+    return results
+
+
+def run_worker(base_url, workload, deadline, max_requests, counter, samples):
+    parts = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=300)
+    while time.perf_counter() < deadline:
+        with workload.lock:
+            if max_requests is not None and counter[0] >= max_requests:
+                break
+            counter[0] += 1
+
+        endpoint, method, path, body = workload.next_request()
+        payload = json.dumps(body) if body is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+            status = response.status
+        except (http.client.HTTPException, OSError):
+            # Reconnect after a dropped connection
+            connection.close()
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=300)
+            content, status = b"", 599
+        latency = time.perf_counter() - start
+
+        failed = response_failed(endpoint, status, content)
+        samples.setdefault(endpoint, []).append((latency, status, len(content), failed))
+        workload.completed(endpoint, body, failed)
+    connection.close()
+
+
+def start_server(db_path, port):
+    """Start uvicorn in a thread, with the working directory set to the database directory."""
+    import uvicorn
+
+    os.chdir(os.path.dirname(os.path.abspath(db_path)))
+    config = uvicorn.Config("api:app", host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def get_catalog_info(db_path):
+    connection = sqlite3.connect(db_path)
+    info = {}
+    for table in ("courses", "objectives", "course_tag", "tags", "course_hierarchy"):
+        try:
+            info[table] = connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        except sqlite3.OperationalError:
+            info[table] = None
+    z_codes = [row[0] for row in connection.execute(
+        "SELECT z_code FROM courses WHERE status = 'APPROVED' AND z_code || '_pending' NOT IN (SELECT z_code FROM courses)"
+    )]
+    connection.close()
+    return info, z_codes
+
+
+def get_git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, weight = part.split("=")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a mixed workload against the API.")
+    parser.add_argument("--db", default="benchmarks/courses.db", help="Database to serve and edit.")
+    parser.add_argument("--url", help="Use an already running API instead of starting one in-process.")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the in-process server.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run the workload.")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of concurrent clients.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Endpoint weights, e.g. 'courses=1,tags=5'.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Path of the JSON results, defaults to benchmarks/results/.")
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db)
+    if args.url is None and os.path.basename(db_path) != "courses.db":
+        # api.py always opens courses.db in its working directory
+        parser.error("--db must point to a file named courses.db when the API runs in-process")
+    output = os.path.abspath(args.output) if args.output else None
+    commit = get_git_commit()
+    catalog, z_codes = get_catalog_info(db_path)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server, thread = start_server(db_path, args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    workload = Workload(z_codes, parse_mix(args.mix), args.seed)
+    samples_per_worker = [{} for _ in range(args.concurrency)]
+    counter = [0]
+
+    start = time.perf_counter()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(run_worker, base_url, workload, deadline, args.requests, counter, samples)
+            for samples in samples_per_worker
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    if server is not None:
+        server.should_exit = True
+        thread.join()
+
+    samples = {}
+    for worker_samples in samples_per_worker:
+        for endpoint, endpoint_samples in worker_samples.items():
+            samples.setdefault(endpoint, []).extend(endpoint_samples)
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "settings": {
+            "duration": args.duration,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            "url": args.url,
+        },
+        "catalog": catalog,
+        "elapsed_s": elapsed,
+        "total_requests": sum(len(endpoint_samples) for endpoint_samples in samples.values()),
+        "endpoints": summarize(samples, elapsed),
+    }
+
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{commit or 'nocommit'}.json")
+    with open(output, "w") as results_file:
+        json.dump(report, results_file, indent=2)
+
+    print(f"{'endpoint':<14}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, result in report["endpoints"].items():
+        latencies = "".join(
+            f"{result[key]:>10.1f}" if result[key] is not None else f"{'-':>10}"
+            for key in ("p50_ms", "p95_ms", "p99_ms")
+        )
+        print(f"{endpoint:<14}{result['requests']:>10}{result['errors']:>8}{result['throughput_rps']:>10.1f}{latencies}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import sqlite3
+import uuid
+
+
+# Function to create the change log table if it does not exist yet
+def setup_change_log(cursor):
+    # The revision is the AUTOINCREMENT key, so it never goes down, even after a rebuild of the courses
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS course_changes (
+            revision INTEGER PRIMARY KEY AUTOINCREMENT,
+            z_code TEXT,
+            operation TEXT,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+    # Random id of this database, revisions of different databases must not be compared
+    cursor.execute("CREATE TABLE IF NOT EXISTS catalog (id TEXT)")
+    cursor.execute("INSERT INTO catalog (id) SELECT ? WHERE NOT EXISTS (SELECT 1 FROM catalog)", (uuid.uuid4().hex,))
+
+
+def record_changes(cursor, z_codes, operation="upsert"):
+    """
+    Log changed courses and bump the catalog revision.
+
+    Args:
+        cursor: Cursor of an open connection, committed by the caller.
+        z_codes (list): Z-codes of the changed courses.
+        operation (str): 'upsert' or 'delete'.
+    """
+    setup_change_log(cursor)
+    cursor.executemany(
+        "INSERT INTO course_changes (z_code, operation) VALUES (?, ?)",
+        [(z_code, operation) for z_code in z_codes]
+    )
+
+
+def get_revision(cursor):
+    try:
+        cursor.execute("SELECT MAX(revision) FROM course_changes")
+    except sqlite3.OperationalError:
+        # No change has been logged yet
+        return 0
+    return cursor.fetchone()[0] or 0
+
+
+def get_catalog_version(cursor):
+    """
+    Identify the current state of the catalog.
+
+    Returns:
+        tuple: The catalog id, or None for databases built before it existed, and the revision.
+    """
+    try:
+        cursor.execute("SELECT id FROM catalog")
+    except sqlite3.OperationalError:
+        return None, get_revision(cursor)
+    row = cursor.fetchone()
+    return (row[0] if row else None), get_revision(cursor)
+
+
+def get_changes_since(cursor, since):
+    """
+    Collect the courses that changed after a revision.
+
+    Returns:
+        tuple: The current revision, the upserted z_codes and the deleted z_codes.
+        Only the last operation per course counts.
+    """
+    revision = get_revision(cursor)
+    if since >= revision:
+        return revision, [], []
+
+    cursor.execute("""
+        SELECT z_code, operation
+        FROM course_changes
+        WHERE revision IN (
+            SELECT MAX(revision) FROM course_changes WHERE revision > ? AND revision <= ? GROUP BY z_code
+        )
+        ORDER BY revision
+    """, (since, revision))
+    upserted = []
+    deleted = []
+    for z_code, operation in cursor.fetchall():
+        if operation == "delete":
+            deleted.append(z_code)
+        else:
+            upserted.append(z_code)
+
+    return revision, upserted, deleted
@@ -0,0 +1,110 @@
+import heapq
+import random
+from collections import deque
+
+
+def generate_course_connections(courses, max_phase=3):
+    """
+    Connect every course to a random course of exactly one phase higher.
+
+    Courses are bucketed by phase first, so picking a candidate is a lookup
+    instead of a scan over all courses.
+
+    Args:
+        courses (list): Tuples of (z_code, phase).
+        max_phase (int): Courses in this phase or higher get no connection.
+
+    Returns:
+        list: Tuples of (z_code_1, z_code_2).
+    """
+    courses_by_phase = {}
+    for z_code, phase in courses:
+        courses_by_phase.setdefault(phase, []).append(z_code)
+
+    connections = []
+    for z_code, phase in courses:
+        if phase is None or phase >= max_phase:
+            continue
+        next_courses = courses_by_phase.get(phase + 1)
+        if next_courses:
+            connections.append((z_code, random.choice(next_courses)))
+    return connections
+
+
+# Function to index the connection columns, so lookups in both directions don't scan the table
+def index_course_connections(cursor):
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_course_connections_z_code_1 ON course_connections (z_code_1)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_course_connections_z_code_2 ON course_connections (z_code_2)')
+
+
+class CourseGraph:
+    """In-memory adjacency lists of the course_connections table."""
+
+    def __init__(self, phases, connections):
+        self.phases = phases
+        self.successors = {z_code: [] for z_code in phases}
+        self.predecessors = {z_code: [] for z_code in phases}
+        for z_code_1, z_code_2 in connections:
+            self.successors.setdefault(z_code_1, []).append(z_code_2)
+            self.predecessors.setdefault(z_code_2, []).append(z_code_1)
+
+    def __contains__(self, z_code):
+        return z_code in self.successors or z_code in self.predecessors
+
+    def study_order(self):
+        """
+        Order the courses so every course comes after its predecessors.
+
+        Ties are broken by phase and z_code, so the order is stable.
+
+        Returns:
+            tuple: The ordered z_codes and the z_codes left out because they are part of a cycle.
+        """
+        nodes = set(self.successors) | set(self.predecessors)
+        in_degree = {z_code: len(self.predecessors.get(z_code, [])) for z_code in nodes}
+
+        def sort_key(z_code):
+            phase = self.phases.get(z_code)
+            return (phase if phase is not None else 0, z_code)
+
+        ready = [sort_key(z_code) for z_code, degree in in_degree.items() if degree == 0]
+        heapq.heapify(ready)
+
+        order = []
+        while ready:
+            _, z_code = heapq.heappop(ready)
+            order.append(z_code)
+            for next_z_code in self.successors.get(z_code, []):
+                in_degree[next_z_code] -= 1
+                if in_degree[next_z_code] == 0:
+                    heapq.heappush(ready, sort_key(next_z_code))
+
+        in_cycle = sorted(z_code for z_code, degree in in_degree.items() if degree > 0)
+        return order, in_cycle
+
+    def shortest_path(self, from_z_code, to_z_code):
+        """Breadth-first search along the connections, or None if there is no path."""
+        previous = {from_z_code: None}
+        queue = deque([from_z_code])
+        while queue:
+            z_code = queue.popleft()
+            if z_code == to_z_code:
+                path = []
+                while z_code is not None:
+                    path.append(z_code)
+                    z_code = previous[z_code]
+                return path[::-1]
+            for next_z_code in self.successors.get(z_code, []):
+                if next_z_code not in previous:
+                    previous[next_z_code] = z_code
+                    queue.append(next_z_code)
+        return None
+
+
+def load_course_graph(cursor):
+    # Pending copies are not part of the study programme
+    cursor.execute("SELECT z_code, phase FROM courses WHERE z_code NOT LIKE '%\\_pending' ESCAPE '\\'")
+    phases = dict(cursor.fetchall())
+
+    cursor.execute("SELECT z_code_1, z_code_2 FROM course_connections ORDER BY z_code_1, z_code_2")
+    return CourseGraph(phases, cursor.fetchall())
@@ -0,0 +1,130 @@
+import json
+
+
+# Function to create the parent/child edge table if it does not exist yet
+def setup_course_hierarchy(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS course_hierarchy (
+            parent_z_code TEXT,
+            child_z_code TEXT,
+            PRIMARY KEY (parent_z_code, child_z_code),
+            FOREIGN KEY (parent_z_code) REFERENCES courses(z_code),
+            FOREIGN KEY (child_z_code) REFERENCES courses(z_code)
+        )
+        ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_course_hierarchy_child ON course_hierarchy (child_z_code)')
+
+
+def ensure_course_hierarchy(cursor):
+    """
+    Create and fill the edge table for databases built before it existed.
+
+    Returns:
+        bool: True if the table had to be created, the caller should commit.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'course_hierarchy'")
+    if cursor.fetchone() is not None:
+        return False
+    sync_course_hierarchy(cursor)
+    return True
+
+
+def parse_parent_courses(parent_course_str):
+    if not parent_course_str:
+        return []
+    return [z.strip() for z in parent_course_str.split(",") if z.strip()]
+
+
+def sync_course_hierarchy(cursor, z_codes=None):
+    """
+    Rebuild the edges of courses from their comma-separated parent_course column.
+
+    Args:
+        cursor: Cursor of an open connection, committed by the caller.
+        z_codes (list): Child courses to resync, or None to rebuild every edge.
+    """
+    if z_codes is not None and ensure_course_hierarchy(cursor):
+        # The table was just filled from scratch
+        return
+
+    setup_course_hierarchy(cursor)
+    if z_codes is None:
+        cursor.execute("DELETE FROM course_hierarchy")
+        cursor.execute("SELECT z_code, parent_course FROM courses")
+    else:
+        z_codes_json = json.dumps(list(z_codes))
+        cursor.execute(
+            "DELETE FROM course_hierarchy WHERE child_z_code IN (SELECT value FROM json_each(?))",
+            (z_codes_json,)
+        )
+        cursor.execute(
+            "SELECT z_code, parent_course FROM courses WHERE z_code IN (SELECT value FROM json_each(?))",
+            (z_codes_json,)
+        )
+
+    edges = [
+        (parent_z_code, z_code)
+        for z_code, parent_course in cursor.fetchall()
+        for parent_z_code in parse_parent_courses(parent_course)
+    ]
+    cursor.executemany(
+        "INSERT OR IGNORE INTO course_hierarchy (parent_z_code, child_z_code) VALUES (?, ?)",
+        edges
+    )
+
+
+def get_parents_by_child(cursor, z_codes=None):
+    """Map every child z_code, or only the given z_codes, to the list of its parent z_codes."""
+    if z_codes is None:
+        cursor.execute("SELECT parent_z_code, child_z_code FROM course_hierarchy")
+    else:
+        cursor.execute(
+            """
+            SELECT parent_z_code, child_z_code
+            FROM course_hierarchy
+            WHERE child_z_code IN (SELECT value FROM json_each(?))
+            """,
+            (json.dumps(list(z_codes)),)
+        )
+    parents_by_child = {}
+    for parent_z_code, child_z_code in cursor.fetchall():
+        parents_by_child.setdefault(child_z_code, []).append(parent_z_code)
+    return parents_by_child
+
+
+def get_descendants(cursor, z_code, max_depth):
+    """
+    Walk down the hierarchy from a course with a recursive CTE.
+
+    Returns:
+        list: Tuples of (z_code, depth), with the shortest depth for courses
+        that are reachable along several paths.
+    """
+    cursor.execute("""
+        WITH RECURSIVE descendants (z_code, depth) AS (
+            SELECT child_z_code, 1 FROM course_hierarchy WHERE parent_z_code = ?
+            UNION
+            SELECT h.child_z_code, d.depth + 1
+            FROM course_hierarchy h
+            JOIN descendants d ON h.parent_z_code = d.z_code
+            WHERE d.depth < ?
+        )
+        SELECT z_code, MIN(depth) FROM descendants GROUP BY z_code ORDER BY MIN(depth), z_code
+    """, (z_code, max_depth))
+    return cursor.fetchall()
+
+
+def get_ancestors(cursor, z_code, max_depth):
+    """Same as get_descendants, but walking up to the parents."""
+    cursor.execute("""
+        WITH RECURSIVE ancestors (z_code, depth) AS (
+            SELECT parent_z_code, 1 FROM course_hierarchy WHERE child_z_code = ?
+            UNION
+            SELECT h.parent_z_code, a.depth + 1
+            FROM course_hierarchy h
+            JOIN ancestors a ON h.child_z_code = a.z_code
+            WHERE a.depth < ?
+        )
+        SELECT z_code, MIN(depth) FROM ancestors GROUP BY z_code ORDER BY MIN(depth), z_code
+    """, (z_code, max_depth))
+    return cursor.fetchall()
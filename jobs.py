@@ -0,0 +1,202 @@
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import scraper
+from changes import record_changes
+from metrics import TimedConnection, logger
+from stats import refresh_catalog_stats
+
+MAX_FINISHED_JOBS = 1000  # Finished jobs kept for GET /scrape/jobs/{id}
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class ScrapeJobQueue:
+    """
+    Bounded worker pool that re-scrapes courses without rebuilding the database.
+
+    Jobs for the same target are deduplicated: enqueueing a course that is
+    already queued or running returns the existing job.
+    """
+
+    def __init__(self, database="courses.db", max_workers=2, max_queued=100, on_change=None):
+        self.database = database
+        self.max_queued = max_queued
+        self.on_change = on_change  # Called after a job wrote to the database
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()  # id -> job
+        self.active = {}  # target -> id of the queued or running job
+
+    def enqueue_course(self, z_code):
+        return self.enqueue(z_code, self.scrape_course, z_code)
+
+    def enqueue_programme(self):
+        return self.enqueue("programme", self.scrape_programme)
+
+    def enqueue(self, target, run, *args):
+        with self.lock:
+            if target in self.active:
+                return dict(self.jobs[self.active[target]], deduplicated=True)
+
+            queued = sum(1 for job in self.jobs.values() if job["status"] == "queued")
+            if queued >= self.max_queued:
+                raise QueueFullError("Too many scrape jobs queued")
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "target": target,
+                "status": "queued",
+                "progress": {"done": 0, "total": None},
+                "result": None,
+                "error": None,
+                "created_at": now(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self.jobs[job["id"]] = job
+            self.active[target] = job["id"]
+            self.prune()
+
+        self.executor.submit(self.run_job, job, run, *args)
+        return dict(job)
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job, progress=dict(job["progress"])) if job else None
+
+    def prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def run_job(self, job, run, *args):
+        with self.lock:
+            job["status"] = "running"
+            job["started_at"] = now()
+        try:
+            result = run(job, *args)
+            status, error = "done", None
+        except Exception as e:
+            logger.exception(f"Scrape job {job['id']} failed")
+            result, status, error = None, "failed", str(e)
+
+        with self.lock:
+            job.update(status=status, result=result, error=error, finished_at=now())
+            del self.active[job["target"]]
+
+        if status == "done" and self.on_change is not None:
+            self.on_change()
+
+    def set_progress(self, job, done, total):
+        with self.lock:
+            job["progress"] = {"done": done, "total": total}
+
+    def scrape_course(self, job, z_code):
+        """Refresh the objectives and learning contents of one existing course."""
+        self.set_progress(job, 0, 1)
+
+        conn = sqlite3.connect(self.database, factory=TimedConnection)
+        try:
+            if conn.execute("SELECT 1 FROM courses WHERE z_code = ?", (z_code,)).fetchone() is None:
+                raise LookupError(f"Course {z_code} not found")
+        finally:
+            conn.close()
+
+        soup, final_url = scraper.fetch_with_suffixes(z_code)
+        if soup is None:
+            raise LookupError(f"Failed to retrieve page for Z-code {z_code}")
+        objectives, learning_contents = scraper.extract_course_details(soup)
+
+        conn = sqlite3.connect(self.database, factory=TimedConnection)
+        try:
+            write_course_details(conn.cursor(), z_code, objectives, learning_contents)
+            record_changes(conn.cursor(), [z_code])
+            conn.commit()
+        finally:
+            conn.close()
+
+        self.set_progress(job, 1, 1)
+        return {"z_code": z_code, "url": final_url, "objectives": len(objectives)}
+
+    def scrape_programme(self, job):
+        """Re-scrape the overview page and every course on it, upserting only their rows."""
+        courses = scraper.scrape_courses(scraper.url, scraper.headers)
+        if not courses:
+            raise LookupError("No Z-codes found on the overview page")
+        self.set_progress(job, 0, len(courses))
+
+        failed = []
+        for index, course in enumerate(courses, 1):
+            soup, _ = scraper.fetch_with_suffixes(course['z_code'])
+            details = scraper.extract_course_details(soup) if soup else None
+
+            # Write every course in its own short transaction, so the API is not blocked for the whole run
+            conn = sqlite3.connect(self.database, factory=TimedConnection)
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO courses (z_code, course_name, phase, phase_is_mandatory, semester, status)
+                    VALUES (?, ?, ?, ?, ?, 'APPROVED')
+                    ON CONFLICT (z_code) DO UPDATE SET
+                        course_name = excluded.course_name,
+                        phase = excluded.phase,
+                        phase_is_mandatory = excluded.phase_is_mandatory,
+                        semester = excluded.semester
+                """, (course['z_code'], course['course_name'], course.get('phase'),
+                      course.get('phase_is_mandatory'), course.get('semester')))
+                if details:
+                    write_course_details(cursor, course['z_code'], *details)
+                else:
+                    failed.append(course['z_code'])
+                record_changes(cursor, [course['z_code']])
+                conn.commit()
+            finally:
+                conn.close()
+
+            self.set_progress(job, index, len(courses))
+
+        # Recompute the aggregates once for the whole programme
+        conn = sqlite3.connect(self.database, factory=TimedConnection)
+        try:
+            refresh_catalog_stats(conn.cursor())
+            conn.commit()
+        finally:
+            conn.close()
+
+        return {"courses": len(courses), "failed": failed}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def write_course_details(cursor, z_code, objectives, learning_contents):
+    """
+    Replace the scraped (Dutch) objectives and learning contents of a course.
+
+    The syllabus pages only hold the Dutch text, so the English translation
+    of an objective is kept as long as its Dutch text did not change.
+    """
+    cursor.execute("UPDATE courses SET learning_contents_nl = ? WHERE z_code = ?", (learning_contents, z_code))
+    cursor.execute(
+        "SELECT objective_text_nl, objective_text_en FROM objectives WHERE course_z_code = ? AND objective_text_en IS NOT NULL",
+        (z_code,)
+    )
+    translations = dict(cursor.fetchall())
+
+    cursor.execute("DELETE FROM objectives WHERE course_z_code = ?", (z_code,))
+    cursor.executemany(
+        "INSERT INTO objectives (course_z_code, objective_text_nl, objective_text_en) VALUES (?, ?, ?)",
+        [(z_code, objective, translations.get(objective)) for objective in objectives if objective]
+    )
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,298 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from contextvars import ContextVar
+
+logger = logging.getLogger("api")
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds in bytes of the response size histogram buckets
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+
+class Metrics:
+    """Thread-safe collection of the counters and histograms exposed on /metrics."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.request_latency = {}  # (method, route) -> Histogram
+        self.response_size = {}  # (method, route) -> Histogram
+        self.responses = {}  # (method, route, status) -> count
+        self.query_latency = {}  # statement -> Histogram
+        self.query_rows = {}  # statement -> rows returned
+        self.cache_lookups = {}  # (cache, result) -> count
+
+    def observe_request(self, method, route, status, duration, size):
+        with self.lock:
+            self.request_latency.setdefault((method, route), Histogram(LATENCY_BUCKETS)).observe(duration)
+            self.response_size.setdefault((method, route), Histogram(SIZE_BUCKETS)).observe(size)
+            key = (method, route, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def observe_query(self, statement, duration, rows):
+        with self.lock:
+            self.query_latency.setdefault(statement, Histogram(LATENCY_BUCKETS)).observe(duration)
+            self.query_rows[statement] = self.query_rows.get(statement, 0) + rows
+
+    def observe_cache(self, cache, hit):
+        key = (cache, "hit" if hit else "miss")
+        with self.lock:
+            self.cache_lookups[key] = self.cache_lookups.get(key, 0) + 1
+
+    def render(self):
+        """Format all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            render_histograms(lines, "api_request_duration_seconds", "Request latency per route.",
+                              ("method", "route"), self.request_latency)
+            render_histograms(lines, "api_response_size_bytes", "Response body size per route.",
+                              ("method", "route"), self.response_size)
+
+            lines.append("# HELP api_responses_total Responses per route and status code.")
+            lines.append("# TYPE api_responses_total counter")
+            for (method, route, status), count in sorted(self.responses.items()):
+                lines.append(f"api_responses_total{format_labels(method=method, route=route, status=status)} {count}")
+
+            render_histograms(lines, "api_sql_query_duration_seconds", "SQLite query time, including fetching.",
+                              ("statement",), {(statement,): h for statement, h in self.query_latency.items()})
+
+            lines.append("# HELP api_sql_rows_total Rows returned per SQLite statement.")
+            lines.append("# TYPE api_sql_rows_total counter")
+            for statement, rows in sorted(self.query_rows.items()):
+                lines.append(f"api_sql_rows_total{format_labels(statement=statement)} {rows}")
+
+            lines.append("# HELP api_cache_lookups_total Cache lookups per cache and result.")
+            lines.append("# TYPE api_cache_lookups_total counter")
+            for (cache, result), count in sorted(self.cache_lookups.items()):
+                lines.append(f"api_cache_lookups_total{format_labels(cache=cache, result=result)} {count}")
+
+            lines.append("# HELP api_cache_hit_ratio Share of cache lookups that were hits.")
+            lines.append("# TYPE api_cache_hit_ratio gauge")
+            for cache in sorted({cache for cache, _ in self.cache_lookups}):
+                hits = self.cache_lookups.get((cache, "hit"), 0)
+                total = hits + self.cache_lookups.get((cache, "miss"), 0)
+                lines.append(f"api_cache_hit_ratio{format_labels(cache=cache)} {hits / total}")
+
+        return "\n".join(lines) + "\n"
+
+
+def escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def format_labels(**labels):
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def render_histograms(lines, name, description, label_names, histograms):
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} histogram")
+    for label_values, histogram in sorted(histograms.items()):
+        labels = dict(zip(label_names, label_values))
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{format_labels(**labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_bucket{format_labels(**labels, le='+Inf')} {histogram.count}")
+        lines.append(f"{name}_sum{format_labels(**labels)} {histogram.sum}")
+        lines.append(f"{name}_count{format_labels(**labels)} {histogram.count}")
+
+
+metrics = Metrics()
+
+# Queries executed while handling the current request, for the slow-request log
+request_queries = ContextVar("request_queries", default=None)
+
+
+def normalize_statement(sql):
+    # Collapse whitespace and variable-length placeholder lists, so each query gets one label
+    statement = " ".join(sql.split())
+    return re.sub(r"\?(\s*,\s*\?)+", "?, ...", statement)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that times every statement and counts the rows it returns."""
+
+    statement = None
+    duration = 0.0
+    rows = 0
+
+    def execute(self, sql, parameters=()):
+        self.finish()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.begin(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.finish()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.begin(sql, time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self.duration += time.perf_counter() - start
+        if row is not None:
+            self.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self.duration += time.perf_counter() - start
+        self.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self.duration += time.perf_counter() - start
+        self.rows += len(rows)
+        self.finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self.duration += time.perf_counter() - start
+            self.finish()
+            raise
+        self.duration += time.perf_counter() - start
+        self.rows += 1
+        return row
+
+    def close(self):
+        self.finish()
+        super().close()
+
+    def begin(self, sql, duration):
+        self.statement = normalize_statement(sql)
+        self.duration = duration
+        self.rows = 0
+
+    def finish(self):
+        """Record the previous statement once it is done."""
+        if self.statement is None:
+            return
+        metrics.observe_query(self.statement, self.duration, self.rows)
+        queries = request_queries.get()
+        if queries is not None:
+            queries.append((self.statement, self.duration, self.rows))
+        self.statement = None
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors are TimedCursors, pass as factory to sqlite3.connect."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timed_cursors = weakref.WeakSet()
+
+    def cursor(self, factory=TimedCursor):
+        cursor = super().cursor(factory)
+        self.timed_cursors.add(cursor)
+        return cursor
+
+    # The built-in shortcuts create plain cursors, so route them through cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        # Cursors that were never exhausted are recorded when the connection closes
+        for cursor in list(self.timed_cursors):
+            cursor.finish()
+        super().close()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records latency, response size and status code per route.
+
+    Requests slower than slow_request_threshold seconds are logged together
+    with the queries they ran. None disables the slow-request log.
+    """
+
+    def __init__(self, app, slow_request_threshold=None):
+        self.app = app
+        self.slow_request_threshold = slow_request_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+        queries = []
+        duration = None
+        token = request_queries.set(queries)
+
+        async def send_wrapper(message):
+            nonlocal status, size, duration, queries
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+            # Background tasks run after the last body message, neither their time nor their queries count
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                duration = time.perf_counter() - start
+                queries = queries[:]
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if duration is None:
+                duration = time.perf_counter() - start
+            request_queries.reset(token)
+
+            # Label with the route template, so path parameters don't create new series
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            metrics.observe_request(scope["method"], route_path, status, duration, size)
+
+            if self.slow_request_threshold is not None and duration >= self.slow_request_threshold:
+                log_slow_request(scope, status, duration, queries)
+
+
+def log_slow_request(scope, status, duration, queries):
+    breakdown = "".join(
+        f"\n    {query_duration * 1000:8.1f} ms {rows:>7} rows  {statement[:200]}"
+        for statement, query_duration, rows in sorted(queries, key=lambda query: query[1], reverse=True)
+    )
+    logger.warning(
+        f"Slow request {scope['method']} {scope['path']} -> {status} in {duration * 1000:.1f} ms, "
+        f"{len(queries)} queries taking {sum(query[1] for query in queries) * 1000:.1f} ms{breakdown}"
+    )
@@ -1,4 +1,9 @@
 from pydantic import BaseModel
+from typing import List
 class Verification(BaseModel):
     z_code: str
-    key: str
\ No newline at end of file
+    key: str
+
+class BatchVerification(BaseModel):
+    z_codes: List[str]
+    key: str
@@ -5,23 +5,27 @@ import sqlite3
 import warnings
 import logging
 import re
-import random
+
+from changes import record_changes, setup_change_log
+from graph import generate_course_connections, index_course_connections
+from hierarchy import setup_course_hierarchy, sync_course_hierarchy
+from snapshot import SNAPSHOT_PATH, write_catalog_snapshot
+from stats import refresh_catalog_stats
 
 # TODO - Change naming to be more accurate across the codebase
 # TODO - Remove redundant code and functions
 # TODO - Get credits from overview page
 # TODO - Get evaluation methods from detail course page
 
-# Set up logging
-logging.basicConfig(filename='scraper.log', level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
-
 # Suppress InsecureRequestWarning
 warnings.filterwarnings("ignore", message="Unverified HTTPS request")
 
 # URL of the overview page where Z-codes are listed
 url = "https://onderwijsaanbodkempen.thomasmore.be/2024/opleidingen/n/SC_51260641.htm"
 
+# Base URL of the syllabus pages of the courses
+syllabus_base_url = "https://onderwijsaanbodkempen.thomasmore.be/2024/syllabi/n/"
+
 # Headers that contain the courses to scrape from the overview page
 headers = [
     'Verplichte opleidingsonderdelen',
@@ -241,9 +245,9 @@ def is_valid_objective(text):
 
 
 # Function to try fetching content from the Z-code with different suffixes
-def fetch_with_suffixes(z_code):
+def fetch_with_suffixes(z_code, base_url=None):
     suffixes = ["N", "E", ""]
-    base_url = "https://onderwijsaanbodkempen.thomasmore.be/2024/syllabi/n/"
+    base_url = base_url or syllabus_base_url
 
     for suffix in suffixes:
         try:
@@ -256,6 +260,67 @@ def fetch_with_suffixes(z_code):
     return None, None  # Return None if all attempts fail
 
 
+def extract_course_details(soup):
+    """
+    Extract the objectives and learning contents from a syllabus page.
+
+    Returns:
+        tuple: The cleaned objectives (list) and the learning contents HTML (str).
+    """
+    # Objectives extraction (same as original)
+    objectives_div = soup.find(id=lambda x: x and x.startswith("tab_doelstellingen_idp"))
+    objectives = set()
+
+    if objectives_div:
+        list_items = objectives_div.find_all('li')
+        for li in list_items:
+            objective_text = li.get_text().strip().replace('\xa0', ' ')
+            if objective_text and is_valid_objective(objective_text):
+                objectives.add(objective_text)
+
+        paragraphs = objectives_div.find_all('p')
+        for p in paragraphs:
+            full_text = p.get_text(separator='<br>').strip()
+            split_objectives = full_text.split('<br>')
+            for obj in split_objectives:
+                normalized_obj = obj.strip().replace('\xa0', ' ')
+                cleaned_obj = clean_text(normalized_obj)
+
+                if cleaned_obj and is_valid_objective(cleaned_obj):
+                    objectives.add(cleaned_obj)
+
+    cleaned_objectives = clean_and_join_objectives(list(objectives))
+
+    # Find all divs that match the content pattern
+    contents_divs = soup.find_all('div',
+                                  id=lambda x: x and x.startswith('tab_inhoud_') and x.endswith('_content'))
+
+    learning_contents = ''
+    if contents_divs:
+        # Collect contents from all matching divs
+        all_contents = []
+        for contents_div in contents_divs:
+            # Remove print-only tags
+            for tag in contents_div.find_all(class_='print_only'):
+                tag.decompose()
+
+            # Preserve some attributes
+            allowed_attrs = ['id', 'class']
+            for attr in list(contents_div.attrs.keys()):
+                if attr not in allowed_attrs:
+                    del contents_div.attrs[attr]
+
+            # Convert to string, preserving HTML structure
+            cleaned_contents = str(contents_div)
+            if cleaned_contents.strip():
+                all_contents.append(cleaned_contents)
+
+        # Join multiple content divs
+        learning_contents = '\n'.join(all_contents)
+
+    return cleaned_objectives, learning_contents
+
+
 def scrape_courses_data(course_data):
     for course in course_data:
         z_code = course['z_code']
@@ -267,56 +332,7 @@ def scrape_courses_data(course_data):
 
         if soup:
             try:
-                # Objectives extraction (same as original)
-                objectives_div = soup.find(id=lambda x: x and x.startswith("tab_doelstellingen_idp"))
-                objectives = set()
-
-                if objectives_div:
-                    list_items = objectives_div.find_all('li')
-                    for li in list_items:
-                        objective_text = li.get_text().strip().replace('\xa0', ' ')
-                        if objective_text and is_valid_objective(objective_text):
-                            objectives.add(objective_text)
-
-                    paragraphs = objectives_div.find_all('p')
-                    for p in paragraphs:
-                        full_text = p.get_text(separator='<br>').strip()
-                        split_objectives = full_text.split('<br>')
-                        for obj in split_objectives:
-                            normalized_obj = obj.strip().replace('\xa0', ' ')
-                            cleaned_obj = clean_text(normalized_obj)
-
-                            if cleaned_obj and is_valid_objective(cleaned_obj):
-                                objectives.add(cleaned_obj)
-
-                cleaned_objectives = clean_and_join_objectives(list(objectives))
-                course['objectives'] = cleaned_objectives
-
-                # Find all divs that match the content pattern
-                contents_divs = soup.find_all('div',
-                                              id=lambda x: x and x.startswith('tab_inhoud_') and x.endswith('_content'))
-
-                if contents_divs:
-                    # Collect contents from all matching divs
-                    all_contents = []
-                    for contents_div in contents_divs:
-                        # Remove print-only tags
-                        for tag in contents_div.find_all(class_='print_only'):
-                            tag.decompose()
-
-                        # Preserve some attributes
-                        allowed_attrs = ['id', 'class']
-                        for attr in list(contents_div.attrs.keys()):
-                            if attr not in allowed_attrs:
-                                del contents_div.attrs[attr]
-
-                        # Convert to string, preserving HTML structure
-                        cleaned_contents = str(contents_div)
-                        if cleaned_contents.strip():
-                            all_contents.append(cleaned_contents)
-
-                    # Join multiple content divs
-                    course['learning_contents'] = '\n'.join(all_contents)
+                course['objectives'], course['learning_contents'] = extract_course_details(soup)
 
                 print(f"Successfully scraped course: {course['course_name']} from {final_url}")
 
@@ -340,6 +356,8 @@ def setup_database():
     cursor.execute('DROP TABLE IF EXISTS learning_tracks')
     cursor.execute('DROP TABLE IF EXISTS tags')
     cursor.execute('DROP TABLE IF EXISTS profiles')
+    cursor.execute('DROP TABLE IF EXISTS course_hierarchy')
+    cursor.execute('DROP TABLE IF EXISTS catalog_stats')
 
   # Create profiles table
     cursor.execute('''
@@ -409,6 +427,7 @@ def setup_database():
             FOREIGN KEY (z_code_2) REFERENCES courses(z_code)
         )
         ''')
+    index_course_connections(cursor)
 
     cursor.execute('''
             CREATE TABLE IF NOT EXISTS course_tag (
@@ -420,9 +439,31 @@ def setup_database():
             )
             ''')
 
+    # Index the z_code references, so lookups and ordered exports don't need a full scan or sort
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_objectives_course_z_code ON objectives (course_z_code)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_course_tag_course_z_code ON course_tag (course_z_code)')
+
+    # Parent/child links between courses, derived from courses.parent_course
+    setup_course_hierarchy(cursor)
+
+    # The change log is kept across runs, so API consumers can sync the differences
+    setup_change_log(cursor)
+
     return conn, cursor
 
 
+# Function to fetch the Z-codes currently in the database, before it is rebuilt
+def get_existing_z_codes():
+    conn = sqlite3.connect('courses.db')
+    try:
+        return {row[0] for row in conn.execute('SELECT z_code FROM courses')}
+    except sqlite3.OperationalError:
+        # No courses table yet
+        return set()
+    finally:
+        conn.close()
+
+
 def insert_fake_connections(conn, cursor):
     # TODO - Add logic for semester-based connections
 
@@ -431,19 +472,7 @@ def insert_fake_connections(conn, cursor):
     courses = cursor.fetchall()
 
     # Generate connections between courses with strictly consecutive phases
-    connections = []
-    for current_z_code, current_phase in courses:
-        # Only connect to courses exactly one phase higher
-        if current_phase < 3:
-            next_courses = [
-                z_code for z_code, phase in courses
-                if phase == current_phase + 1
-            ]
-
-            # If there are next courses available, create a connection
-            if next_courses:
-                next_course_z_code = random.choice(next_courses)
-                connections.append((current_z_code, next_course_z_code))
+    connections = generate_course_connections(courses)
 
     # Empty the course_connections table
     cursor.execute("DELETE FROM course_connections")
@@ -452,7 +481,7 @@ def insert_fake_connections(conn, cursor):
     if connections:
         cursor.executemany(
             '''
-            INSERT INTO course_connections (course_z_code, next_course_z_code)
+            INSERT INTO course_connections (z_code_1, z_code_2)
             VALUES (?, ?)
             ''', connections
         )
@@ -550,6 +579,9 @@ def main():
         # Scrape course data
         course_data = scrape_courses_data(courses)
 
+        # Remember the current courses, so removed ones can be logged as deleted
+        previous_z_codes = get_existing_z_codes()
+
         # Set up the database
         conn, cursor = setup_database()
 
@@ -563,9 +595,24 @@ def main():
         # Insert manual connections for testing, uncomment when needed
         # insert_fake_connections(conn, cursor)
 
+        # Derive the parent/child links from the inserted courses
+        sync_course_hierarchy(cursor)
+
+        # Log the rebuild in the change log, bumping the catalog revision
+        scraped_z_codes = [course['z_code'] for course in course_data]
+        record_changes(cursor, previous_z_codes - set(scraped_z_codes), 'delete')
+        record_changes(cursor, scraped_z_codes)
+
+        # Materialize the catalog aggregates served on /stats
+        refresh_catalog_stats(cursor)
+        conn.commit()
+
         # Close the database connection
         conn.close()
 
+        # Compile the catalog snapshot that the API workers serve
+        write_catalog_snapshot('courses.db', SNAPSHOT_PATH)
+
         print("Data scraping and insertion complete.")
     else:
         print("No Z-codes found. Scraping aborted.")
@@ -573,4 +620,8 @@ def main():
 
 # Run the main function
 if __name__ == "__main__":
+    # Set up logging
+    logging.basicConfig(filename='scraper.log', level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
     main()
\ No newline at end of file
@@ -0,0 +1,236 @@
+import gzip
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+
+from changes import get_catalog_version, setup_change_log
+from hierarchy import ensure_course_hierarchy, get_parents_by_child
+
+# Compiled catalog next to courses.db, written by the scraper and the API
+SNAPSHOT_PATH = "courses.snapshot"
+
+# File layout: header, JSON and gzip blobs, then a JSON index of (offset, length) pairs into the file
+SNAPSHOT_MAGIC = b"ECTSSNAP"
+SNAPSHOT_FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sI32sQQQ")  # magic, format version, catalog id, catalog revision, index offset, index length
+
+
+def encode_json(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def read_courses(connection, flat=False):
+    """
+    Read all courses with their objectives, tags and child courses, as served on /courses.
+
+    Args:
+        connection: Open connection, its row factory is set to sqlite3.Row.
+        flat (bool): Reference the parents instead of nesting the child courses.
+    """
+    connection.row_factory = sqlite3.Row  # Access rows as dictionaries
+    cursor = connection.cursor()
+
+    # Fetch all courses
+    cursor.execute("SELECT * FROM courses ORDER BY phase_is_mandatory DESC")
+    courses = cursor.fetchall()
+
+    # Fetch objectives grouped by course_z_code
+    cursor.execute("SELECT course_z_code, objective_text_nl, objective_text_en FROM objectives")
+    objectives = cursor.fetchall()
+
+    # Create a mapping of course_z_code to objectives
+    objectives_by_course = {}
+    for obj in objectives:
+        course_z_code = obj["course_z_code"]
+        if course_z_code not in objectives_by_course:
+            objectives_by_course[course_z_code] = []
+        objectives_by_course[course_z_code].append({
+            "nl": obj["objective_text_nl"],
+            "en": obj["objective_text_en"]
+        })  # Opslaan als dictionary
+        
+    # Fetch tags grouped by course_z_code
+    cursor.execute(
+        """
+        SELECT ct.course_z_code, t.name 
+        FROM course_tag ct
+        JOIN tags t ON ct.tag_id = t.id
+        """
+    )
+    tags = cursor.fetchall()
+    
+    # Create a mapping of course_z_code to tags
+    tags_by_course = {}
+    for tag in tags:
+        course_z_code = tag["course_z_code"]
+        if course_z_code not in tags_by_course:
+            tags_by_course[course_z_code] = []
+        tags_by_course[course_z_code].append(tag["name"])  # Only include name
+
+    # Create a mapping of z_code to course data
+    courses_dict = {course["z_code"]: dict(course) for course in courses}
+
+    # Fetch the parent/child links
+    if ensure_course_hierarchy(cursor):
+        connection.commit()
+    parents_by_child = get_parents_by_child(cursor)
+
+    # Process each course and add objectives, tags, and child courses
+    for course in courses_dict.values():
+        course["objectives"] = objectives_by_course.get(course["z_code"], [])  # Default to empty list
+        course["tags"] = tags_by_course.get(course["z_code"], [])  # Default to empty list
+        if flat:
+            # Only reference the parents, instead of embedding copies of the children
+            course["parent_z_codes"] = parents_by_child.get(course["z_code"], [])
+        else:
+            course["childs"] = []  # Initialize child courses list
+
+    # Assign child courses to parents
+    if not flat:
+        for course in courses_dict.values():
+            for parent_z_code in parents_by_child.get(course["z_code"], []):
+                if parent_z_code in courses_dict:
+                    courses_dict[parent_z_code]["childs"].append(course)
+
+    return list(courses_dict.values())  # Convert back to list
+
+
+# Serializes snapshot writes of the threads in this process
+snapshot_lock = threading.Lock()
+
+
+def write_catalog_snapshot(db_path, snapshot_path, factory=sqlite3.Connection):
+    """Compile the catalog of a database into the snapshot file, unless it is already up to date."""
+    with snapshot_lock:
+        connection = sqlite3.connect(db_path, factory=factory)
+        cursor = connection.cursor()
+        catalog_id, revision = get_catalog_version(cursor)
+        if catalog_id is None:
+            # Databases built before the catalog id existed get one now
+            setup_change_log(cursor)
+            connection.commit()
+            catalog_id, revision = get_catalog_version(cursor)
+
+        # A snapshot of another database can have any revision, so only an exact match is current
+        if read_snapshot_version(snapshot_path) == (catalog_id, revision):
+            connection.close()
+            return
+
+        courses = read_courses(connection)
+        connection.close()
+        write_snapshot(snapshot_path, catalog_id, revision, courses)
+
+
+def write_snapshot(path, catalog_id, revision, courses):
+    """
+    Compile the course list into a snapshot file, replacing the old one atomically.
+
+    The file holds the pre-encoded and gzipped JSON of the whole list and of
+    every single course, so they can be served as slices of a memory map.
+
+    Args:
+        path (str): Path of the snapshot file.
+        catalog_id (str): Id of the database the courses were read from.
+        revision (int): Catalog revision the courses were read at.
+        courses (list): Course dictionaries, as returned on /courses.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    index = {"courses": {}}
+
+    with open(tmp_path, "wb") as snapshot_file:
+        snapshot_file.write(b"\0" * HEADER.size)
+
+        def append(blob):
+            offset = snapshot_file.tell()
+            snapshot_file.write(blob)
+            return [offset, len(blob)]
+
+        list_json = encode_json(courses)
+        index["list"] = append(list_json)
+        index["list_gzip"] = append(gzip.compress(list_json, compresslevel=6))
+        for course in courses:
+            course_json = encode_json(course)
+            index["courses"][course["z_code"]] = append(course_json) + append(gzip.compress(course_json, compresslevel=6))
+
+        index_offset, index_length = append(encode_json(index))
+        snapshot_file.seek(0)
+        snapshot_file.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, catalog_id.encode("ascii"),
+                                         revision, index_offset, index_length))
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+
+    os.replace(tmp_path, path)
+
+
+def read_snapshot_version(path):
+    """Catalog id and revision of an existing snapshot, or None if there is no valid snapshot."""
+    try:
+        with open(path, "rb") as snapshot_file:
+            magic, version, catalog_id, revision, _, _ = HEADER.unpack(snapshot_file.read(HEADER.size))
+    except (OSError, struct.error):
+        return None
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_FORMAT_VERSION:
+        return None
+    return catalog_id.rstrip(b"\0").decode("ascii"), revision
+
+
+class Snapshot:
+    """Read-only memory map of a snapshot file; slices share the page cache across processes."""
+
+    def __init__(self, path):
+        with open(path, "rb") as snapshot_file:
+            self.stat = os.fstat(snapshot_file.fileno())
+            self.map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, catalog_id, self.revision, index_offset, index_length = HEADER.unpack_from(self.map)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_FORMAT_VERSION} catalog snapshot")
+        self.catalog_id = catalog_id.rstrip(b"\0").decode("ascii")
+        self.version = (self.catalog_id, self.revision)
+        self.index = json.loads(self.map[index_offset:index_offset + index_length])
+        self.view = memoryview(self.map)
+
+    def slice(self, offset, length):
+        return self.view[offset:offset + length]
+
+    def course_list(self, compressed=False):
+        return self.slice(*self.index["list_gzip" if compressed else "list"])
+
+    def course(self, z_code, compressed=False):
+        """The encoded course, or None if the course is not in the snapshot."""
+        entry = self.index["courses"].get(z_code)
+        if entry is None:
+            return None
+        return self.slice(*(entry[2:] if compressed else entry[:2]))
+
+
+class SnapshotLoader:
+    """Keeps the latest snapshot mapped, remapping it when the file is replaced."""
+
+    def __init__(self, path):
+        self.path = path
+        self.snapshot = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """The current snapshot, or None if there is none."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+
+        snapshot = self.snapshot
+        if snapshot is not None and (snapshot.stat.st_ino, snapshot.stat.st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns):
+            return snapshot
+
+        with self.lock:
+            if self.snapshot is snapshot:
+                try:
+                    # The old map stays valid for responses that are still being sent
+                    self.snapshot = Snapshot(self.path)
+                except (OSError, ValueError, struct.error):
+                    return None
+            return self.snapshot
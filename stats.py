@@ -0,0 +1,149 @@
+import sqlite3
+
+from changes import get_revision
+
+# Every dimension is one GROUP BY over the courses, pending copies are left out
+STATS_QUERIES = {
+    "phase": """
+        SELECT phase, COUNT(*), SUM(credits), SUM(phase_is_mandatory)
+        FROM catalog_courses
+        GROUP BY phase
+    """,
+    "semester": """
+        SELECT semester, COUNT(*), SUM(credits), SUM(phase_is_mandatory)
+        FROM catalog_courses
+        GROUP BY semester
+    """,
+    "phase_semester": """
+        SELECT phase || '-' || semester, COUNT(*), SUM(credits), SUM(phase_is_mandatory)
+        FROM catalog_courses
+        GROUP BY phase, semester
+    """,
+    "mandatory": """
+        SELECT CASE WHEN phase_is_mandatory THEN 'mandatory' ELSE 'optional' END,
+               COUNT(*), SUM(credits), SUM(phase_is_mandatory)
+        FROM catalog_courses
+        GROUP BY 1
+    """,
+    "learning_track": """
+        SELECT COALESCE(lt.name, 'None'), COUNT(*), SUM(c.credits), SUM(c.phase_is_mandatory)
+        FROM catalog_courses c
+        LEFT JOIN learning_tracks lt ON c.learning_track_id = lt.id
+        GROUP BY c.learning_track_id
+    """,
+    "tag": """
+        SELECT t.name, COUNT(*), SUM(c.credits), SUM(c.phase_is_mandatory)
+        FROM catalog_courses c
+        JOIN course_tag ct ON ct.course_z_code = c.z_code
+        JOIN tags t ON ct.tag_id = t.id
+        GROUP BY t.id
+    """,
+    "programme": """
+        SELECT programme, COUNT(*), SUM(credits), SUM(phase_is_mandatory)
+        FROM catalog_courses
+        GROUP BY programme
+    """,
+    "total": """
+        SELECT 'all', COUNT(*), SUM(credits), SUM(phase_is_mandatory)
+        FROM catalog_courses
+    """,
+}
+
+
+# Function to create the summary table if it does not exist yet
+def setup_catalog_stats(cursor):
+    # key has no declared type, so phases and semesters stay numbers
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_stats (
+            dimension TEXT,
+            key,
+            courses INTEGER,
+            credits INTEGER,
+            mandatory INTEGER,
+            revision INTEGER
+        )
+        ''')
+
+
+def refresh_catalog_stats(cursor):
+    """
+    Recompute the aggregates and materialize them into catalog_stats.
+
+    Args:
+        cursor: Cursor of an open connection, committed by the caller.
+    """
+    setup_catalog_stats(cursor)
+    revision = get_revision(cursor)
+
+    cursor.execute("DROP VIEW IF EXISTS temp.catalog_courses")
+    cursor.execute("""
+        CREATE TEMP VIEW catalog_courses AS
+        SELECT * FROM courses WHERE z_code NOT LIKE '%\\_pending' ESCAPE '\\'
+    """)
+
+    rows = []
+    for dimension, query in STATS_QUERIES.items():
+        cursor.execute(query)
+        rows.extend((dimension, key, courses, credits or 0, mandatory or 0, revision)
+                    for key, courses, credits, mandatory in cursor.fetchall())
+
+    cursor.execute("DELETE FROM catalog_stats")
+    cursor.executemany(
+        "INSERT INTO catalog_stats (dimension, key, courses, credits, mandatory, revision) VALUES (?, ?, ?, ?, ?, ?)",
+        rows
+    )
+
+
+def catalog_stats_outdated(cursor):
+    """
+    Check whether real courses changed after the aggregates were computed.
+
+    Changes to pending copies only don't count, they are left out of the aggregates.
+    """
+    try:
+        cursor.execute("SELECT revision FROM catalog_stats LIMIT 1")
+    except sqlite3.OperationalError:
+        return True
+    row = cursor.fetchone()
+    if row is None:
+        return True
+
+    try:
+        cursor.execute(r"""
+            SELECT revision FROM course_changes
+            WHERE z_code NOT LIKE '%\_pending' ESCAPE '\'
+            ORDER BY revision DESC
+            LIMIT 1
+        """)
+    except sqlite3.OperationalError:
+        return False
+    last_change = cursor.fetchone()
+    return last_change is not None and last_change[0] > row[0]
+
+
+def read_catalog_stats(cursor):
+    """
+    Read the materialized aggregates, or None if they were never computed.
+
+    Returns:
+        dict: The catalog revision, the totals and a list of groups per dimension.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'catalog_stats'")
+    if cursor.fetchone() is None:
+        return None
+
+    cursor.execute("SELECT dimension, key, courses, credits, mandatory, revision FROM catalog_stats ORDER BY rowid")
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    stats = {"revision": rows[0][5], "total": None}
+    stats.update((f"by_{dimension}", []) for dimension in STATS_QUERIES if dimension != "total")
+    for dimension, key, courses, credits, mandatory, _ in rows:
+        group = {"key": key, "courses": courses, "credits": credits, "mandatory": mandatory}
+        if dimension == "total":
+            del group["key"]
+            stats["total"] = group
+        else:
+            stats.setdefault(f"by_{dimension}", []).append(group)
+    return stats
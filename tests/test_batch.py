@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import api
+from benchmarks.generate_catalog import generate_catalog
+from models.course import Course
+
+
+def course(z_code, summary="Nieuwe samenvatting", objectives=(("Doel", "Goal"),), tags=(), credits=6):
+    return Course(
+        z_code=z_code,
+        summary=summary,
+        summaryEnglish="New summary",
+        objectives=[{"nl": nl, "en": en} for nl, en in objectives],
+        tags=list(tags),
+        credits=credits,
+    )
+
+
+class InsertCoursesTest(unittest.TestCase):
+    """Submits batches to insert_courses against a generated catalog."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+        # api.py opens courses.db in the working directory
+        working_directory = os.getcwd()
+        os.chdir(self.directory.name)
+        self.addCleanup(os.chdir, working_directory)
+        generate_catalog("courses.db", courses=4, objectives=2, tags=3, tags_per_course=1,
+                         depth=0, programmes=1, seed=1)
+
+    def query(self, sql, parameters=()):
+        connection = sqlite3.connect("courses.db")
+        rows = connection.execute(sql, parameters).fetchall()
+        connection.close()
+        return rows
+
+    def objectives(self, z_code):
+        return self.query(
+            "SELECT objective_text_nl, objective_text_en FROM objectives WHERE course_z_code = ? ORDER BY id",
+            (z_code,)
+        )
+
+    def tags(self, z_code):
+        return self.query(
+            "SELECT t.name FROM course_tag ct JOIN tags t ON ct.tag_id = t.id WHERE ct.course_z_code = ? ORDER BY ct.id",
+            (z_code,)
+        )
+
+    def test_mixed_batch(self):
+        results = api.insert_courses([
+            course("Z0000000", tags=["Tag 1", "Unknown tag"]),
+            course("Z9999999"),
+            course("Z0000001", summary="Eerste versie", objectives=[("Eerste", None)]),
+            course("Z0000001", summary="Tweede versie", objectives=[("Tweede", "Second")], tags=["Tag 2"]),
+        ])
+
+        self.assertEqual(results, [
+            {"z_code": "Z0000000", "status": "ok", "course_id": "Z0000000_pending", "unknown_tags": ["Unknown tag"]},
+            {"z_code": "Z9999999", "status": "error", "message": "Course not found"},
+            {"z_code": "Z0000001", "status": "ok", "course_id": "Z0000001_pending",
+             "message": "Superseded by a later item in the batch"},
+            {"z_code": "Z0000001", "status": "ok", "course_id": "Z0000001_pending"},
+        ])
+
+        self.assertEqual(
+            self.query("SELECT z_code, summary_nl, status FROM courses WHERE z_code LIKE '%\\_pending' ESCAPE '\\' ORDER BY z_code"),
+            [("Z0000000_pending", "Nieuwe samenvatting", "PENDING"), ("Z0000001_pending", "Tweede versie", "PENDING")]
+        )
+        self.assertEqual(self.objectives("Z0000000_pending"), [("Doel", "Goal")])
+        self.assertEqual(self.tags("Z0000000_pending"), [("Tag 1",)])
+        self.assertEqual(self.objectives("Z0000001_pending"), [("Tweede", "Second")])
+        self.assertEqual(self.tags("Z0000001_pending"), [("Tag 2",)])
+
+        # The approved courses are left alone until they are verified
+        self.assertEqual(self.query("SELECT summary_nl FROM courses WHERE z_code = 'Z0000001'"),
+                         [("Samenvatting van cursus 1",)])
+        self.assertEqual(len(self.objectives("Z0000001")), 2)
+
+        self.assertEqual(
+            self.query("SELECT z_code FROM course_changes WHERE z_code LIKE '%\\_pending' ESCAPE '\\' ORDER BY revision"),
+            [("Z0000000_pending",), ("Z0000001_pending",)]
+        )
+
+    def test_failing_item_is_rolled_back_alone(self):
+        connection = sqlite3.connect("courses.db")
+        connection.execute("""
+            CREATE TRIGGER reject_course BEFORE INSERT ON courses WHEN NEW.z_code = 'Z0000002_pending'
+            BEGIN SELECT RAISE(ABORT, 'rejected'); END
+        """)
+        connection.commit()
+        connection.close()
+
+        results = api.insert_courses([course("Z0000001"), course("Z0000002"), course("Z0000003")])
+
+        self.assertEqual([result["status"] for result in results], ["ok", "error", "ok"])
+        self.assertEqual(results[1]["message"], "rejected")
+        self.assertEqual(
+            self.query("SELECT z_code FROM courses WHERE status = 'PENDING' ORDER BY z_code"),
+            [("Z0000001_pending",), ("Z0000003_pending",)]
+        )
+        self.assertEqual(self.objectives("Z0000002_pending"), [])
+
+    def test_resubmission_updates_pending_course(self):
+        api.insert_courses([course("Z0000002", summary="Eerste", objectives=[("Eerste", None)], tags=["Tag 0"])])
+        results = api.insert_courses([
+            course("Z0000002", summary="Tweede", objectives=[("Tweede", None)], credits=3),
+            course("Z0000003_pending"),
+        ])
+
+        self.assertEqual([result["course_id"] for result in results], ["Z0000002_pending", "Z0000003_pending"])
+        self.assertEqual(
+            self.query("SELECT summary_nl, credits, status FROM courses WHERE z_code = 'Z0000002_pending'"),
+            [("Tweede", 3, "PENDING")]
+        )
+        self.assertEqual(self.objectives("Z0000002_pending"), [("Tweede", None)])
+        self.assertEqual(self.tags("Z0000002_pending"), [])
+
+        # The pending copy can also be addressed directly
+        results = api.insert_courses([course("Z0000002_pending", summary="Derde")])
+        self.assertEqual(results[0]["course_id"], "Z0000002_pending")
+        self.assertEqual(self.query("SELECT summary_nl FROM courses WHERE z_code = 'Z0000002_pending'"), [("Derde",)])
+
+    def test_edit_after_verification_reuses_archived_copy(self):
+        api.insert_courses([course("Z0000003", summary="Eerste")])
+        api.verify_courses(["Z0000003_pending"])
+        results = api.insert_courses([course("Z0000003", summary="Tweede")])
+
+        self.assertEqual(results[0]["status"], "ok")
+        self.assertEqual(
+            self.query("SELECT summary_nl, status FROM courses WHERE z_code = 'Z0000003_pending'"),
+            [("Tweede", "PENDING")]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import uvicorn
+
+import api
+from benchmarks.generate_catalog import generate_catalog
+
+COURSES = 530
+
+
+class ExportTest(unittest.TestCase):
+    """Streams the export in many chunks while other requests use the database."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+        # api.py opens courses.db in the working directory
+        working_directory = os.getcwd()
+        os.chdir(self.directory.name)
+        self.addCleanup(os.chdir, working_directory)
+        generate_catalog("courses.db", courses=COURSES, objectives=2, tags=5, tags_per_course=2,
+                         depth=1, programmes=1, seed=1)
+
+        chunk_size = api.EXPORT_CHUNK_SIZE
+        api.EXPORT_CHUNK_SIZE = 25
+        self.addCleanup(setattr, api, "EXPORT_CHUNK_SIZE", chunk_size)
+
+        # A real server runs every request on one event loop, so the export generator moves between threads
+        self.server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=0, log_level="warning"))
+        thread = threading.Thread(target=self.server.run, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(setattr, self.server, "should_exit", True)
+        while not self.server.started:
+            time.sleep(0.01)
+        self.port = self.server.servers[0].sockets[0].getsockname()[1]
+
+    def request(self, method, path, body=None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        try:
+            connection.request(method, path, body=body and json.dumps(body),
+                               headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            return response.status, response.read().decode("utf-8")
+        finally:
+            connection.close()
+
+    def test_concurrent_exports(self):
+        bodies = [None] * 8
+        errors = []
+
+        def export(index):
+            try:
+                status, bodies[index] = self.request("GET", "/courses/export")
+                self.assertEqual(status, 200)
+            except Exception as e:
+                errors.append(e)
+
+        def edit():
+            try:
+                for _ in range(20):
+                    status, body = self.request("POST", "/courses/batch", [{
+                        "z_code": "Z0000001", "summary": "nl", "summaryEnglish": "en",
+                        "objectives": [], "tags": [], "credits": 3
+                    }])
+                    self.assertEqual(status, 200)
+                    self.assertEqual(json.loads(body)[0]["status"], "ok")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=export, args=(index,)) for index in range(len(bodies))]
+        threads.append(threading.Thread(target=edit))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        for body in bodies:
+            courses = [json.loads(line) for line in body.splitlines()]
+            z_codes = [course["z_code"] for course in courses if not course["z_code"].endswith("_pending")]
+            self.assertEqual(z_codes, [f"Z{index:07d}" for index in range(COURSES)])
+            self.assertEqual(len(courses[0]["objectives"]), 2)
+            self.assertEqual(len(courses[0]["tags"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
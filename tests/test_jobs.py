@@ -0,0 +1,114 @@
+import functools
+import http.server
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+import scraper
+from benchmarks.generate_catalog import generate_catalog
+from jobs import ScrapeJobQueue
+
+SYLLABUS_PAGE = """<html><body>
+<div id="tab_doelstellingen_idp1"><ul>
+<li>De student schrijft correcte SQL queries.</li>
+<li>De student ontwerpt een datamodel.</li>
+</ul></div>
+<div id="tab_inhoud_1_content"><p>Nieuwe inhoud</p></div>
+</body></html>"""
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class ScrapeCourseJobTest(unittest.TestCase):
+    """Runs scrape jobs against a local stub of the syllabus pages."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+        syllabi = os.path.join(self.directory.name, "syllabi")
+        os.mkdir(syllabi)
+        with open(os.path.join(syllabi, "Z0000001N.htm"), "w", encoding="utf-8") as page:
+            page.write(SYLLABUS_PAGE)
+
+        handler = functools.partial(QuietHandler, directory=syllabi)
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        original_base_url = scraper.syllabus_base_url
+        scraper.syllabus_base_url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self.addCleanup(setattr, scraper, "syllabus_base_url", original_base_url)
+
+        self.database = os.path.join(self.directory.name, "courses.db")
+        generate_catalog(self.database, courses=3, objectives=0, tags=0, tags_per_course=0,
+                         depth=0, programmes=1, seed=1)
+        connection = sqlite3.connect(self.database)
+        connection.executemany(
+            "INSERT INTO objectives (course_z_code, objective_text_nl, objective_text_en) VALUES (?, ?, ?)",
+            [("Z0000001", "Schrijft correcte SQL queries", "Writes correct SQL queries"),
+             ("Z0000001", "Oude doelstelling", "Old objective")]
+        )
+        connection.commit()
+        connection.close()
+
+        self.queue = ScrapeJobQueue(database=self.database, max_workers=1)
+        self.addCleanup(self.queue.shutdown)
+
+    def wait(self, job):
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            job = self.queue.get(job["id"])
+            if job["status"] in ("done", "failed"):
+                return job
+            time.sleep(0.01)
+        self.fail(f"Job {job['id']} did not finish")
+
+    def query(self, sql, parameters=()):
+        connection = sqlite3.connect(self.database)
+        rows = connection.execute(sql, parameters).fetchall()
+        connection.close()
+        return rows
+
+    def test_scrape_course_keeps_translations(self):
+        job = self.wait(self.queue.enqueue_course("Z0000001"))
+
+        self.assertEqual(job["status"], "done", job["error"])
+        self.assertEqual(job["result"]["objectives"], 2)
+        self.assertEqual(job["progress"], {"done": 1, "total": 1})
+        self.assertEqual(
+            sorted(self.query("SELECT objective_text_nl, objective_text_en FROM objectives WHERE course_z_code = ?",
+                              ("Z0000001",))),
+            [("Ontwerpt een datamodel", None), ("Schrijft correcte SQL queries", "Writes correct SQL queries")]
+        )
+        self.assertEqual(
+            self.query("SELECT learning_contents_nl FROM courses WHERE z_code = ?", ("Z0000001",)),
+            [('<div id="tab_inhoud_1_content"><p>Nieuwe inhoud</p></div>',)]
+        )
+        self.assertEqual(
+            self.query("SELECT z_code FROM course_changes ORDER BY revision DESC LIMIT 1"),
+            [("Z0000001",)]
+        )
+
+    def test_scrape_course_without_page_fails(self):
+        job = self.wait(self.queue.enqueue_course("Z0000002"))
+
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("Failed to retrieve page", job["error"])
+
+    def test_scrape_unknown_course_fails(self):
+        job = self.wait(self.queue.enqueue_course("Z9999999"))
+
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("not found", job["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
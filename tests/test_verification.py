@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import api
+from benchmarks.generate_catalog import generate_catalog
+from models.course import Course
+
+
+class VerifyCoursesTest(unittest.TestCase):
+    """Migrates pending courses with verify_courses against a generated catalog."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+        # api.py opens courses.db in the working directory
+        working_directory = os.getcwd()
+        os.chdir(self.directory.name)
+        self.addCleanup(os.chdir, working_directory)
+        generate_catalog("courses.db", courses=4, objectives=2, tags=3, tags_per_course=1,
+                         depth=0, programmes=1, seed=1)
+
+        api.insert_courses([
+            Course(z_code="Z0000000", summary="Nieuw 0", summaryEnglish="New 0", credits=12,
+                   objectives=[{"nl": "Eerste", "en": "First"}, {"nl": "Tweede", "en": None}],
+                   tags=["Tag 1", "Tag 2"]),
+            Course(z_code="Z0000001", summary="Nieuw 1", summaryEnglish="New 1", credits=4,
+                   objectives=[], tags=[]),
+        ])
+
+    def query(self, sql, parameters=()):
+        connection = sqlite3.connect("courses.db")
+        rows = connection.execute(sql, parameters).fetchall()
+        connection.close()
+        return rows
+
+    def test_outcome_per_course(self):
+        # A pending course whose real course is gone
+        connection = sqlite3.connect("courses.db")
+        connection.execute("INSERT INTO courses (z_code, status) VALUES ('Z9999999_pending', 'PENDING')")
+        connection.commit()
+        connection.close()
+
+        results = api.verify_courses(
+            ["Z0000000_pending", "Z0000002", "Z0000003_pending", "Z9999999_pending", "Z0000001_pending"]
+        )
+
+        self.assertEqual(results, [
+            {"z_code": "Z0000000_pending", "status": "ok", "message": "Verification gelukt!"},
+            {"z_code": "Z0000002", "status": "error", "message": "Course not migrateable"},
+            {"z_code": "Z0000003_pending", "status": "error", "message": "Pending course niet gevonden."},
+            {"z_code": "Z9999999_pending", "status": "error", "message": "Echte course niet gevonden."},
+            {"z_code": "Z0000001_pending", "status": "ok", "message": "Verification gelukt!"},
+        ])
+        self.assertEqual(
+            self.query("SELECT z_code, status FROM courses WHERE z_code LIKE '%\\_pending' ESCAPE '\\' ORDER BY z_code"),
+            [("Z0000000_pending", "ARCHIVED"), ("Z0000001_pending", "ARCHIVED"), ("Z9999999_pending", "PENDING")]
+        )
+
+    def test_migrates_course_objectives_and_tags(self):
+        untouched_objectives = self.query(
+            "SELECT objective_text_nl FROM objectives WHERE course_z_code = 'Z0000002' ORDER BY id"
+        )
+
+        api.verify_courses(["Z0000000_pending", "Z0000001_pending"])
+
+        self.assertEqual(
+            self.query("SELECT z_code, summary_nl, summary_en, credits, status FROM courses "
+                       "WHERE z_code IN ('Z0000000', 'Z0000001') ORDER BY z_code"),
+            [("Z0000000", "Nieuw 0", "New 0", 9, "APPROVED"), ("Z0000001", "Nieuw 1", "New 1", 9, "APPROVED")]
+        )
+        self.assertEqual(
+            self.query("SELECT objective_text_nl, objective_text_en FROM objectives "
+                       "WHERE course_z_code = 'Z0000000' ORDER BY id"),
+            [("Eerste", "First"), ("Tweede", None)]
+        )
+        self.assertEqual(self.query("SELECT COUNT(*) FROM objectives WHERE course_z_code = 'Z0000001'"), [(0,)])
+        self.assertEqual(
+            self.query("SELECT t.name FROM course_tag ct JOIN tags t ON ct.tag_id = t.id "
+                       "WHERE ct.course_z_code = 'Z0000000' ORDER BY ct.id"),
+            [("Tag 1",), ("Tag 2",)]
+        )
+        self.assertEqual(self.query("SELECT COUNT(*) FROM course_tag WHERE course_z_code = 'Z0000001'"), [(0,)])
+
+        # Other courses are left alone
+        self.assertEqual(
+            self.query("SELECT objective_text_nl FROM objectives WHERE course_z_code = 'Z0000002' ORDER BY id"),
+            untouched_objectives
+        )
+
+        self.assertEqual(
+            sorted(self.query("SELECT z_code FROM course_changes ORDER BY revision DESC LIMIT 4")),
+            [("Z0000000",), ("Z0000000_pending",), ("Z0000001",), ("Z0000001_pending",)]
+        )
+
+    def test_nothing_to_migrate(self):
+        revision = self.query("SELECT MAX(revision) FROM course_changes")
+
+        results = api.verify_courses(["Z0000002", "Z0000003_pending"])
+
+        self.assertEqual([result["status"] for result in results], ["error", "error"])
+        self.assertEqual(self.query("SELECT MAX(revision) FROM course_changes"), revision)
+
+
+if __name__ == "__main__":
+    unittest.main()